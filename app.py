@@ -1,13 +1,23 @@
-from flask import Flask, render_template, session, redirect, url_for, request, jsonify
-from authlib.integrations.flask_client import OAuth
+from flask import Flask, Response, render_template, stream_template, session, redirect, url_for, request, jsonify, g
+import atexit
+import hmac
 import os
+import queue
+import re
 import sqlite3
+import threading
+import time
 import click
 from flask.cli import with_appcontext
 from dotenv import load_dotenv
 
 load_dotenv()  # Load environment variables from .env file
 
+import assets
+import metrics  # after load_dotenv: reads PROMETHEUS_MULTIPROC_DIR / SLOW_QUERY_MS at import
+import sessions
+from oidc_cache import CachingOAuth
+
 app = Flask(__name__)
 # Prefer an environment-provided secret key (set this on Render). Fall back to a runtime key for local dev.
 app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24)
@@ -15,31 +25,174 @@ app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24)
 # Database setup
 DATABASE = os.environ.get('DATABASE_PATH', 'database.db')
 
-def get_db():
-    db = sqlite3.connect(DATABASE)
+# Connection pool tuning. Each worker process keeps up to DB_POOL_SIZE idle connections;
+# extra connections opened under load are closed when released instead of being pooled.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+DB_MMAP_SIZE = int(os.environ.get('DB_MMAP_SIZE', 64 * 1024 * 1024))
+# 128 is sqlite3's own default and already holds the ~50 distinct statements the app
+# issues; pooling is what keeps those prepared statements alive across requests.
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get('DB_STATEMENT_CACHE_SIZE', 128))
+
+_db_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+_db_pool_pid = os.getpid()
+
+
+def _connect():
+    """Open a new connection and apply the per-connection PRAGMAs once."""
+    db = sqlite3.connect(
+        DATABASE,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000.0,
+        check_same_thread=False,  # connections move between threads via the pool
+        factory=metrics.InstrumentedConnection,
+        cached_statements=DB_STATEMENT_CACHE_SIZE,
+    )
     db.row_factory = sqlite3.Row
+    # WAL lets readers run alongside a writer; NORMAL is durable enough under WAL.
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute('PRAGMA synchronous=NORMAL')
+    db.execute(f'PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}')
+    db.execute(f'PRAGMA mmap_size={DB_MMAP_SIZE}')
     return db
 
 
-def ensure_was_overdue_column():
-    db = get_db()
-    cursor = db.cursor()
-    # Check if column exists
-    cols = cursor.execute("PRAGMA table_info('todos')").fetchall()
-    col_names = [c['name'] for c in cols]
-    if 'was_overdue' not in col_names:
-        cursor.execute('ALTER TABLE todos ADD COLUMN was_overdue INTEGER NOT NULL DEFAULT 0')
-        db.commit()
-    if 'overdue_time' not in col_names:
-        cursor.execute('ALTER TABLE todos ADD COLUMN overdue_time INTEGER NOT NULL DEFAULT 0')
+def _reset_pool_after_fork():
+    # Connections must never be shared across processes (e.g. gunicorn --preload forks).
+    global _db_pool, _db_pool_pid
+    if _db_pool_pid != os.getpid():
+        _db_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+        _db_pool_pid = os.getpid()
+
+
+def _acquire_connection():
+    _reset_pool_after_fork()
+    try:
+        return _db_pool.get_nowait()
+    except queue.Empty:
+        return _connect()
+
+
+def _release_connection(db):
+    _reset_pool_after_fork()
+    try:
+        if db.in_transaction:
+            db.rollback()
+        _db_pool.put_nowait(db)
+    except (queue.Full, sqlite3.Error):
+        db.close()
+
+
+def get_db():
+    """Return the connection bound to the current app context, checking one out of the pool if needed."""
+    if 'db' not in g:
+        g.db = _acquire_connection()
+    return g.db
+
+
+@app.teardown_appcontext
+def close_db(exc):
+    db = g.pop('db', None)
+    if db is not None:
+        _release_connection(db)
+
+
+# Sessions are kept server-side by default so the cookie is just a signed id;
+# SESSION_BACKEND=cookie falls back to Flask's signed-cookie sessions.
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'sqlite')
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', 1024))
+SESSION_CACHE_TTL = int(os.environ.get('SESSION_CACHE_TTL', 30))
+
+if SESSION_BACKEND == 'sqlite':
+    app.session_interface = sessions.ServerSideSessionInterface(
+        sessions.CachedSessionStore(sessions.SQLiteSessionStore(get_db),
+                                    max_entries=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL))
+elif SESSION_BACKEND != 'cookie':
+    raise RuntimeError(f'Unknown SESSION_BACKEND {SESSION_BACKEND!r} (expected "sqlite" or "cookie")')
+
+
+MIGRATIONS_DIR = os.path.join(app.root_path, 'migrations')
+MIGRATION_FILE_RE = re.compile(r'^(\d+)_[\w-]+\.sql$')
+
+
+def load_migrations():
+    """Return [(version, filename, sql)] for migrations/NNNN_name.sql, ordered by version."""
+    migrations = []
+    for name in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE_RE.match(name)
+        if not match:
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, name), encoding='utf8') as f:
+            migrations.append((int(match.group(1)), name, f.read()))
+    migrations.sort()
+    return migrations
+
+
+def _split_sql(script):
+    # executescript() always commits first, so run statements one by one to keep
+    # each migration and its version bump inside a single transaction.
+    statements, buf = [], ''
+    for line in script.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            statements.append(buf.strip())
+            buf = ''
+    if buf.strip():
+        statements.append(buf.strip())
+    return statements
+
+
+def _current_schema_version(db):
+    tables = {r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if 'schema_version' in tables:
+        return db.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+    db.execute('CREATE TABLE schema_version (version INTEGER PRIMARY KEY, applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)')
+    if 'todos' not in tables:
+        return 0
+    # Databases created before migrations existed: stamp the version their shape matches.
+    cols = {r['name'] for r in db.execute("PRAGMA table_info('todos')")}
+    legacy_version = 2 if {'was_overdue', 'overdue_time'} <= cols else 1
+    db.executemany('INSERT INTO schema_version (version) VALUES (?)', [(v,) for v in range(1, legacy_version + 1)])
+    return legacy_version
+
+
+def run_migrations(db):
+    """Apply pending migrations on `db` and return the list of applied filenames.
+
+    The whole run holds an IMMEDIATE transaction, so concurrent workers booting at
+    the same time serialize here and the losers find nothing left to do.
+    """
+    applied = []
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        current = _current_schema_version(db)
+        for version, name, sql in load_migrations():
+            if version <= current:
+                continue
+            for statement in _split_sql(sql):
+                db.execute(statement)
+            db.execute('INSERT INTO schema_version (version) VALUES (?)', (version,))
+            applied.append(name)
         db.commit()
-    db.close()
+    except Exception:
+        db.rollback()
+        raise
+    return applied
+
+
+def migrate_database():
+    """Run migrations on a dedicated connection (usable outside an app context)."""
+    db = _connect()
+    try:
+        return run_migrations(db)
+    finally:
+        db.close()
+
 
 def init_db():
     db = get_db()
     with app.open_resource('schema.sql') as f:
         db.executescript(f.read().decode('utf8'))
-    db.close()
+    run_migrations(db)
 
 @click.command('init-db')
 @with_appcontext
@@ -51,65 +204,342 @@ def init_db_command():
 app.cli.add_command(init_db_command)
 
 
+@click.command('migrate')
+def migrate_command():
+    """Apply pending schema migrations from migrations/."""
+    applied = migrate_database()
+    for name in applied:
+        click.echo(f'Applied {name}')
+    click.echo(f'Database is up to date ({len(applied)} migration(s) applied).')
+
+app.cli.add_command(migrate_command)
+
+
+def migrate_on_boot():
+    """Bring the schema up to date before serving, instead of inside request handlers.
+
+    Called once by the gunicorn master (gunicorn.conf.py) and by `python app.py`.
+    Errors propagate on purpose: a half-migrated app must not start serving.
+    """
+    with metrics.SCHEMA_MIGRATION_LATENCY.time():
+        applied = migrate_database()
+    for name in applied:
+        app.logger.info('startup: applied migration %s', name)
+
+
 # Safe limits for session increments (one day)
 MAX_SESSION_SECONDS = 24 * 3600
 
 
+# Values above this are assumed to be milliseconds written as seconds.
+MS_HEURISTIC_THRESHOLD = 1000000
+FIX_FOCUSED_TIMES_CHECKPOINT = 'fix-focused-times'
+
+_TODO_TOTAL_SECONDS_SQL = '(COALESCE(duration_hours, 0) * 3600 + COALESCE(duration_minutes, 0) * 60)'
+
+_FIX_FOCUSED_TIMES_WHERE = 'id > ? AND id <= ? AND CAST(focused_time AS INTEGER) > ?'
+
+# Every SET expression sees the pre-update row, so focused_time below is still the raw value.
+_FIX_FOCUSED_TIMES_SQL = f"""
+UPDATE todos SET
+    focused_time = CAST(focused_time AS INTEGER) / 1000,
+    was_overdue = CASE WHEN {_TODO_TOTAL_SECONDS_SQL} > 0
+                        AND CAST(focused_time AS INTEGER) / 1000 > {_TODO_TOTAL_SECONDS_SQL} THEN 1 ELSE 0 END,
+    overdue_time = CASE
+        WHEN {_TODO_TOTAL_SECONDS_SQL} > 0 THEN MAX(0, CAST(focused_time AS INTEGER) / 1000 - {_TODO_TOTAL_SECONDS_SQL})
+        WHEN CAST(overdue_time AS INTEGER) > {MS_HEURISTIC_THRESHOLD} THEN CAST(overdue_time AS INTEGER) / 1000
+        ELSE overdue_time
+    END
+WHERE {_FIX_FOCUSED_TIMES_WHERE}
+"""
+
+
 @click.command('fix-focused-times')
+@click.option('--chunk-size', default=1000, show_default=True, type=click.IntRange(min=1),
+              help='Number of ids covered by each transaction.')
+@click.option('--dry-run', is_flag=True, help='Only count the rows that would be fixed.')
+@click.option('--restart', is_flag=True, help='Ignore any saved checkpoint and scan from the first row.')
 @with_appcontext
-def fix_focused_times():
+def fix_focused_times(chunk_size, dry_run, restart):
     """Scan todos and fix obviously-bad focused_time / overdue_time values (e.g. milliseconds written as seconds).
     This converts values > 1_000_000 by dividing by 1000 and recomputes overdue flags.
+
+    Rows are repaired with one set-based UPDATE per id range, committing between
+    chunks so web workers are never locked out for long. Progress is checkpointed
+    and an interrupted run picks up where it stopped.
     """
     db = get_db()
-    cursor = db.cursor()
-    rows = cursor.execute('SELECT id, focused_time, overdue_time FROM todos').fetchall()
+    max_id = db.execute('SELECT COALESCE(MAX(id), 0) FROM todos').fetchone()[0]
+    start_id = 0
+    if not restart:
+        row = db.execute('SELECT last_id FROM maintenance_checkpoints WHERE name = ?',
+                         (FIX_FOCUSED_TIMES_CHECKPOINT,)).fetchone()
+        if row:
+            start_id = row['last_id']
+            click.echo(f'Resuming after id {start_id}.')
+
     fixed = 0
-    for r in rows:
-        tid = r['id']
-        ft = int(r['focused_time'] or 0)
-        ot = int(r['overdue_time'] or 0)
-        # Heuristic: very large values likely milliseconds
-        if ft > 1000000:
-            new_ft = ft // 1000
-            new_ot = ot // 1000 if ot and ot > 1000000 else ot
-            # recompute overdue based on duration
-            meta = cursor.execute('SELECT duration_hours, duration_minutes FROM todos WHERE id = ?', (tid,)).fetchone()
-            dh = int(meta['duration_hours'] or 0)
-            dm = int(meta['duration_minutes'] or 0)
-            total = (dh * 3600) + (dm * 60)
-            was_overdue = 1 if total > 0 and new_ft > total else 0
-            overdue_time = max(0, new_ft - total) if total > 0 else new_ot
-            cursor.execute('UPDATE todos SET focused_time = ?, overdue_time = ?, was_overdue = ? WHERE id = ?', (new_ft, overdue_time, was_overdue, tid))
-            fixed += 1
+    chunk_starts = range(start_id, max_id, chunk_size)
+    with click.progressbar(chunk_starts, label='Fixing focused times' if not dry_run else 'Scanning') as chunks:
+        for lo in chunks:
+            hi = min(lo + chunk_size, max_id)
+            params = (lo, hi, MS_HEURISTIC_THRESHOLD)
+            if dry_run:
+                fixed += db.execute(f'SELECT COUNT(*) FROM todos WHERE {_FIX_FOCUSED_TIMES_WHERE}', params).fetchone()[0]
+                continue
+            db.execute('BEGIN IMMEDIATE')
+            # Correcting units is not activity: keep it out of user_daily_stats and streaks.
+            db.execute('INSERT INTO stats_log_suspended (reason) VALUES (?)', (FIX_FOCUSED_TIMES_CHECKPOINT,))
+            fixed += db.execute(_FIX_FOCUSED_TIMES_SQL, params).rowcount
+            db.execute('DELETE FROM stats_log_suspended WHERE reason = ?', (FIX_FOCUSED_TIMES_CHECKPOINT,))
+            db.execute(
+                'INSERT INTO maintenance_checkpoints (name, last_id) VALUES (?, ?) '
+                'ON CONFLICT (name) DO UPDATE SET last_id = excluded.last_id, updated_at = CURRENT_TIMESTAMP',
+                (FIX_FOCUSED_TIMES_CHECKPOINT, hi))
+            db.commit()
+
+    if dry_run:
+        click.echo(f'Would fix {fixed} todos.')
+        return
+    db.execute('DELETE FROM maintenance_checkpoints WHERE name = ?', (FIX_FOCUSED_TIMES_CHECKPOINT,))
     db.commit()
-    db.close()
     click.echo(f'Fixed {fixed} todos.')
 
 
 app.cli.add_command(fix_focused_times)
 
+
+# Rebuilds user_stats totals for the current schema. Migration 0007 seeded the table
+# once with its own copy; migrations are history, so this one is the copy to maintain.
+_BACKFILL_USER_STATS_SQL = """
+INSERT INTO user_stats (user_id, total_todos, completed_todos, overdue_todos, total_focus_seconds, total_overdue_seconds)
+SELECT user_id, COUNT(*), SUM(completed != 0), SUM(was_overdue != 0), SUM(focused_time), SUM(overdue_time)
+FROM todos WHERE 1
+GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET
+    total_todos = excluded.total_todos,
+    completed_todos = excluded.completed_todos,
+    overdue_todos = excluded.overdue_todos,
+    total_focus_seconds = excluded.total_focus_seconds,
+    total_overdue_seconds = excluded.total_overdue_seconds
+"""
+
+
+@click.command('backfill-stats')
+@with_appcontext
+def backfill_stats_command():
+    """Rebuild the per-user totals in user_stats from the todos table.
+
+    The triggers keep these current, so this is only needed to repair drift.
+    Streaks and the per-day activity log cannot be reconstructed (todos carry no
+    timestamps) and are left untouched.
+    """
+    db = get_db()
+    db.execute('BEGIN IMMEDIATE')
+    db.execute('UPDATE user_stats SET total_todos = 0, completed_todos = 0, overdue_todos = 0, '
+               'total_focus_seconds = 0, total_overdue_seconds = 0')
+    users = db.execute(_BACKFILL_USER_STATS_SQL).rowcount
+    db.commit()
+    click.echo(f'Rebuilt stats for {users} users.')
+
+
+app.cli.add_command(backfill_stats_command)
+
+# Static assets: built once at startup (once in the master under --preload) and
+# served from memory with versioned URLs, precompressed bodies, ETags and Range support.
+static_assets = assets.build_manifest(app.static_folder)
+
+
+@app.url_defaults
+def fingerprint_static_url(endpoint, values):
+    if endpoint == 'static' and 'filename' in values:
+        asset = static_assets.get(values['filename'])
+        if asset is not None:
+            values.setdefault('v', asset.version)
+
+
+def serve_static(filename):
+    asset = static_assets.get(filename)
+    if asset is not None and app.debug and os.path.getmtime(asset.path) != asset.mtime:
+        # Pick up edits without a restart while developing.
+        asset = static_assets[filename] = assets.load_asset(asset.path)
+    if asset is None:
+        return app.send_static_file(filename)
+
+    encoding = asset.pick_encoding(request.accept_encodings)
+    body = asset.body(encoding)
+    response = Response(body, mimetype=asset.mimetype)
+    if encoding != 'identity':
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(asset.etag(encoding))
+    if request.args.get('v') == asset.version:
+        response.headers['Cache-Control'] = assets.IMMUTABLE_CACHE_CONTROL
+    else:
+        response.headers['Cache-Control'] = assets.REVALIDATE_CACHE_CONTROL
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(body))
+
+
+app.view_functions['static'] = serve_static
+
+
+# Request instrumentation
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    # For streamed responses this covers the time until the body starts streaming.
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        metrics.REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+        metrics.REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+    return response
+
+
+# /metrics is off (404) unless METRICS_TOKEN is set; scrapers then send it as a bearer token.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not METRICS_TOKEN:
+        return jsonify({'error': 'Not found'}), 404
+    auth = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(auth.encode(), f'Bearer {METRICS_TOKEN}'.encode()):
+        return jsonify({'error': 'Unauthorized'}), 401, {'WWW-Authenticate': 'Bearer'}
+    body, content_type = metrics.render_metrics()
+    return body, 200, {'Content-Type': content_type}
+
+
 # OAuth setup
-oauth = OAuth(app)
+# Discovery metadata and JWKS are cached on disk and shared by all workers (see oidc_cache.py).
+oauth = CachingOAuth(app)
 google = oauth.register(
     name='google',
     client_id=os.environ.get('GOOGLE_CLIENT_ID'),
     client_secret=os.environ.get('GOOGLE_CLIENT_SECRET'),
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+    # Overridable so benchmarks and local runs can point at a stub OpenID provider.
+    server_metadata_url=os.environ.get('OAUTH_SERVER_METADATA_URL', 'https://accounts.google.com/.well-known/openid-configuration'),
     client_kwargs={'scope': 'openid email profile'},
+    # Must stay private to the app (the cached JWKS decides which id_tokens are trusted).
+    metadata_cache_dir=os.environ.get('OIDC_CACHE_DIR') or os.path.join(app.instance_path, 'oidc-cache'),
 )
 
+TODO_COLUMNS = 'id, text, completed, duration_hours, duration_minutes, focused_time, was_overdue, overdue_time'
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+
+@app.template_filter('duration')
+def format_duration(todo):
+    parts = []
+    if todo['duration_hours'] and todo['duration_hours'] > 0:
+        parts.append(f"{todo['duration_hours']}h")
+    if todo['duration_minutes'] and todo['duration_minutes'] > 0:
+        parts.append(f"{todo['duration_minutes']}m")
+    return ' '.join(parts)
+
+
 @app.route('/')
 def index():
     user = session.get('user')
     if user:
-        ensure_was_overdue_column()
         db = get_db()
-        todos = db.execute('SELECT * FROM todos WHERE user_id = ?', (user['sub'],)).fetchall()
-        db.close()
-        return render_template('index.html', user=user, todos=todos)
+        # Only the active list is rendered server-side, streamed straight off the cursor;
+        # completed todos are fetched page by page from /api/todos when expanded.
+        active_todos = db.execute(
+            f'SELECT {TODO_COLUMNS} FROM todos WHERE user_id = ? AND completed = 0 ORDER BY id',
+            (user['sub'],))
+        return stream_template('index.html', user=user, active_todos=active_todos)
     return render_template('index.html', user=user)
 
+
+@app.route('/api/todos')
+def list_todos():
+    """Keyset-paginated todo listing.
+
+    Query args: status=active|completed|all, order=asc|desc (by id), limit, and
+    cursor (the `next_cursor` of the previous page).
+    """
+    user = session.get('user')
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    status = request.args.get('status', 'all')
+    order = request.args.get('order', 'asc')
+    if status not in ('active', 'completed', 'all') or order not in ('asc', 'desc'):
+        return jsonify({'error': 'Invalid status or order'}), 400
+    limit = request.args.get('limit', API_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, API_MAX_PAGE_SIZE))
+    cursor = request.args.get('cursor', type=int)
+
+    where = ['user_id = ?']
+    params = [user['sub']]
+    if status != 'all':
+        where.append('completed = ?')
+        params.append(1 if status == 'completed' else 0)
+    if cursor is not None:
+        where.append('id > ?' if order == 'asc' else 'id < ?')
+        params.append(cursor)
+    params.append(limit + 1)
+
+    db = get_db()
+    rows = db.execute(
+        f"SELECT {TODO_COLUMNS} FROM todos WHERE {' AND '.join(where)} ORDER BY id {order.upper()} LIMIT ?",
+        params).fetchall()
+    has_more = len(rows) > limit
+    todos = [dict(r) for r in rows[:limit]]
+    next_cursor = todos[-1]['id'] if has_more else None
+    return jsonify({'todos': todos, 'next_cursor': next_cursor})
+
+
+MAX_STATS_DAYS = 366
+
+
+@app.route('/api/stats')
+def user_stats():
+    """Focus and completion totals from the trigger-maintained aggregate tables.
+
+    Pass days=N to also get the last N days of activity (UTC), newest first.
+    """
+    user = session.get('user')
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    days = max(0, min(request.args.get('days', 0, type=int), MAX_STATS_DAYS))
+    db = get_db()
+    row = db.execute(
+        "SELECT *, date('now') AS today, date('now', '-1 day') AS yesterday FROM user_stats WHERE user_id = ?",
+        (user['sub'],)).fetchone()
+    today = db.execute(
+        "SELECT focus_seconds, completed_count FROM user_daily_stats WHERE user_id = ? AND day = date('now')",
+        (user['sub'],)).fetchone()
+
+    stats = {
+        'total_todos': 0, 'completed_todos': 0, 'active_todos': 0, 'overdue_todos': 0, 'overdue_ratio': 0.0,
+        'total_focus_seconds': 0, 'total_overdue_seconds': 0,
+        'current_streak': 0, 'longest_streak': 0, 'last_active_day': None,
+    }
+    if row:
+        stats.update({k: row[k] for k in ('total_todos', 'completed_todos', 'overdue_todos', 'total_focus_seconds',
+                                          'total_overdue_seconds', 'longest_streak', 'last_active_day')})
+        stats['active_todos'] = row['total_todos'] - row['completed_todos']
+        stats['overdue_ratio'] = round(row['overdue_todos'] / row['total_todos'], 4) if row['total_todos'] else 0.0
+        # The stored streak only breaks on the next activity; report it as broken once a full day is missed.
+        if row['last_active_day'] in (row['today'], row['yesterday']):
+            stats['current_streak'] = row['current_streak']
+    stats['today'] = dict(today) if today else {'focus_seconds': 0, 'completed_count': 0}
+    if days:
+        stats['daily'] = [dict(r) for r in db.execute(
+            "SELECT day, focus_seconds, completed_count FROM user_daily_stats "
+            "WHERE user_id = ? AND day > date('now', ?) ORDER BY day DESC",
+            (user['sub'], f'-{days} days'))]
+    return jsonify(stats)
+
 @app.route('/login')
 def login():
     redirect_uri = url_for('authorize', _external=True)
@@ -118,7 +548,8 @@ def login():
 @app.route('/authorize')
 def authorize():
     try:
-        token = google.authorize_access_token()
+        with metrics.OAUTH_LATENCY.labels('access_token').time():
+            token = google.authorize_access_token()
     except Exception as e:
         app.logger.exception("oauth: authorize_access_token failed")
         return "OAuth authorization failed (check server logs)", 500
@@ -129,14 +560,16 @@ def authorize():
         if isinstance(token, dict):
             user_info = token.get('userinfo')
         if not user_info:
-            resp = google.get('userinfo')
+            with metrics.OAUTH_LATENCY.labels('userinfo').time():
+                resp = google.get('userinfo')
             resp.raise_for_status()
             user_info = resp.json()
     except Exception:
         app.logger.exception("oauth: failed to obtain userinfo")
         return "Failed to fetch user info from provider (check server logs)", 500
 
-    session['user'] = user_info
+    # Routes only use `sub` (and the template `name`); keep the session small.
+    session['user'] = {k: user_info.get(k) for k in ('sub', 'name', 'email')}
     return redirect('/')
 
 @app.route('/logout')
@@ -159,12 +592,12 @@ def add_todo():
         return jsonify({'error': 'All fields are required'}), 400
 
     db = get_db()
+    db.begin_immediate()
     cursor = db.cursor()
     cursor.execute('INSERT INTO todos (user_id, text, duration_hours, duration_minutes, focused_time, was_overdue, overdue_time) VALUES (?, ?, ?, ?, 0, 0, 0)', 
                    (user['sub'], todo_text, duration_hours, duration_minutes))
     new_todo_id = cursor.lastrowid
     db.commit()
-    db.close()
 
     return jsonify({'id': new_todo_id, 'text': todo_text, 'completed': 0, 'duration_hours': duration_hours, 'duration_minutes': duration_minutes, 'focused_time': 0, 'was_overdue': 0, 'overdue_time': 0})
 
@@ -178,12 +611,29 @@ def delete_todo():
     todo_id = data.get('id')
 
     db = get_db()
+    db.begin_immediate()
     db.execute('DELETE FROM todos WHERE id = ? AND user_id = ?', (todo_id, user['sub']))
+    db.execute('DELETE FROM focus_sessions WHERE todo_id = ? AND user_id = ?', (todo_id, user['sub']))
     db.commit()
-    db.close()
 
     return jsonify({'result': 'success'})
 
+@app.route('/clear_completed', methods=['POST'])
+def clear_completed():
+    """Delete all of the user's completed todos in one transaction (the "Clear All" button)."""
+    user = session.get('user')
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    db = get_db()
+    db.begin_immediate()
+    db.execute('DELETE FROM focus_sessions WHERE user_id = ? AND todo_id IN '
+               '(SELECT id FROM todos WHERE user_id = ? AND completed = 1)', (user['sub'], user['sub']))
+    deleted = db.execute('DELETE FROM todos WHERE user_id = ? AND completed = 1', (user['sub'],)).rowcount
+    db.commit()
+
+    return jsonify({'result': 'success', 'deleted': deleted})
+
 @app.route('/toggle', methods=['POST'])
 def toggle_todo():
     user = session.get('user')
@@ -194,12 +644,12 @@ def toggle_todo():
     todo_id = data.get('id')
 
     db = get_db()
+    db.begin_immediate()
     todo = db.execute('SELECT completed FROM todos WHERE id = ? AND user_id = ?', (todo_id, user['sub'])).fetchone()
     if todo:
         new_completed_status = not todo['completed']
         db.execute('UPDATE todos SET completed = ? WHERE id = ?', (new_completed_status, todo_id))
-        db.commit()
-    db.close()
+    db.commit()
 
     return jsonify({'result': 'success'})
 
@@ -218,13 +668,18 @@ def update_focus_time():
     except Exception:
         ft = 0
     # If value is unreasonably large, it might be milliseconds -> convert
-    if ft > 1000000:
+    if ft > MS_HEURISTIC_THRESHOLD:
         ft = ft // 1000
     # clamp to a sane maximum (1 day)
     if ft > MAX_SESSION_SECONDS:
         ft = MAX_SESSION_SECONDS
 
+    # Absolute writes overwrite whatever other tabs synced; the web client never sends them
+    # (resets go through /discard_focus_session). The flush below only drains this worker.
+    focus_buffer.flush()
+
     db = get_db()
+    db.begin_immediate()
     # update focused_time with normalized value
     db.execute('UPDATE todos SET focused_time = ? WHERE id = ? AND user_id = ?', (ft, todo_id, user['sub']))
 
@@ -242,24 +697,231 @@ def update_focus_time():
 
     db.execute('UPDATE todos SET was_overdue = ?, overdue_time = ? WHERE id = ? AND user_id = ?', (was_overdue, overdue_time, todo_id, user['sub']))
     db.commit()
-    db.close()
 
     # Return normalized focused_time so client can sync
     return jsonify({'result': 'success', 'was_overdue': was_overdue, 'overdue_time': overdue_time, 'focused_time': ft})
 
+# Write-behind buffer for /sync. Heartbeats are coalesced per (user, todo, session)
+# in memory and folded into the database in one transaction every
+# FOCUS_FLUSH_INTERVAL seconds (0 = write through on every request).
+FOCUS_FLUSH_INTERVAL = float(os.environ.get('FOCUS_FLUSH_INTERVAL', 2.0))
+FOCUS_BUFFER_MAX_ENTRIES = int(os.environ.get('FOCUS_BUFFER_MAX_ENTRIES', 1000))
+FOCUS_SESSION_RETENTION_DAYS = 2
+MAX_SYNC_BATCH = 200
+
+_FOCUS_UPSERT_SQL = """
+INSERT INTO focus_sessions (session_id, todo_id, user_id, seconds, pending)
+SELECT ?, id, user_id, ?, ? FROM todos WHERE id = ? AND user_id = ?
+ON CONFLICT (session_id, todo_id) DO UPDATE SET
+    pending = pending + CASE WHEN discarded THEN 0 ELSE MAX(0, excluded.seconds - seconds) END,
+    seconds = MAX(seconds, excluded.seconds),
+    updated_at = CURRENT_TIMESTAMP
+"""
+
+# Fold pending session seconds into todos and recompute the overdue columns in one pass.
+_FOCUS_APPLY_SQL = """
+UPDATE todos SET
+    focused_time = d.new_ft,
+    was_overdue = CASE WHEN d.total > 0 AND d.new_ft > d.total THEN 1 ELSE 0 END,
+    overdue_time = CASE WHEN d.total > 0 AND d.new_ft > d.total THEN d.new_ft - d.total ELSE 0 END
+FROM (
+    SELECT t.id,
+           MIN(?, t.focused_time + SUM(s.pending)) AS new_ft,
+           COALESCE(t.duration_hours, 0) * 3600 + COALESCE(t.duration_minutes, 0) * 60 AS total
+    FROM focus_sessions s JOIN todos t ON t.id = s.todo_id AND t.user_id = s.user_id
+    WHERE s.pending > 0
+    GROUP BY t.id
+) AS d
+WHERE todos.id = d.id
+"""
+
+
+class FocusWriteBuffer:
+    """Coalesces focus-time heartbeats and flushes them in group commits.
+
+    Each entry holds the highest cumulative session total seen, so duplicate or
+    out-of-order heartbeats collapse to one row write per session per flush.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def add(self, user_id, todo_id, session_id, seconds):
+        key = (user_id, todo_id, session_id)
+        with self._lock:
+            self._entries[key] = max(seconds, self._entries.get(key, 0))
+            full = len(self._entries) >= FOCUS_BUFFER_MAX_ENTRIES
+        if self.interval <= 0:
+            self.flush()
+            return
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write all buffered entries in a single transaction. Returns the number written."""
+        with self._lock:
+            entries, self._entries = self._entries, {}
+        if not entries:
+            return 0
+        db = _acquire_connection()
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            db.executemany(_FOCUS_UPSERT_SQL, [
+                (session_id, seconds, seconds, todo_id, user_id)
+                for (user_id, todo_id, session_id), seconds in entries.items()
+            ])
+            db.execute(_FOCUS_APPLY_SQL, (MAX_SESSION_SECONDS,))
+            db.execute('UPDATE focus_sessions SET pending = 0 WHERE pending > 0')
+            db.execute("DELETE FROM focus_sessions WHERE updated_at < datetime('now', ?)",
+                       (f'-{FOCUS_SESSION_RETENTION_DAYS} days',))
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Put the batch back so the next flush retries it.
+            with self._lock:
+                for key, seconds in entries.items():
+                    self._entries[key] = max(seconds, self._entries.get(key, 0))
+            raise
+        finally:
+            _release_connection(db)
+        return len(entries)
+
+    def _ensure_thread(self):
+        # Threads do not survive fork, so each worker starts its own flusher lazily.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='focus-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                app.logger.exception('sync: focus buffer flush failed')
+
+
+focus_buffer = FocusWriteBuffer(FOCUS_FLUSH_INTERVAL)
+
+
+@atexit.register
+def _flush_focus_buffer_on_exit():
+    try:
+        focus_buffer.flush()
+    except Exception:
+        app.logger.exception('sync: final focus buffer flush failed')
+
+
+_FOCUS_DISCARD_SQL = """
+INSERT INTO focus_sessions (session_id, todo_id, user_id, seconds, pending, discarded)
+SELECT ?, id, user_id, ?, 0, 1 FROM todos WHERE id = ? AND user_id = ?
+ON CONFLICT (session_id, todo_id) DO UPDATE SET
+    seconds = MAX(seconds, excluded.seconds),
+    pending = 0,
+    discarded = 1,
+    updated_at = CURRENT_TIMESTAMP
+"""
+
+_FOCUS_SUBTRACT_SQL = f"""
+UPDATE todos SET
+    focused_time = d.new_ft,
+    was_overdue = CASE WHEN d.total > 0 AND d.new_ft > d.total THEN 1 ELSE 0 END,
+    overdue_time = CASE WHEN d.total > 0 AND d.new_ft > d.total THEN d.new_ft - d.total ELSE 0 END
+FROM (
+    SELECT id, MAX(0, focused_time - ?) AS new_ft, {_TODO_TOTAL_SECONDS_SQL} AS total
+    FROM todos WHERE id = ? AND user_id = ?
+) AS d
+WHERE todos.id = d.id
+"""
+
+
+@app.route('/discard_focus_session', methods=['POST'])
+def discard_focus_session():
+    """Take one focus session back out of a todo (the Pomodoro reset button).
+
+    Body: {"id", "session_id", "seconds"} where seconds is the session's final total.
+    The session's ledger row is advanced to that total and marked discarded in the
+    same transaction that subtracts whatever part of it was already applied, so
+    heartbeats for it that are still buffered in any worker, or retried by the
+    client, apply nothing afterwards. Discarding twice is a no-op.
+    """
+    user = session.get('user')
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True) or {}
+    try:
+        todo_id = int(data['id'])
+        session_id = str(data['session_id'])[:64]
+        seconds = max(0, min(int(data['seconds']), MAX_SESSION_SECONDS))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'id, session_id and seconds are required'}), 400
+
+    db = get_db()
+    db.begin_immediate()
+    row = db.execute('SELECT seconds, discarded FROM focus_sessions WHERE session_id = ? AND todo_id = ? AND user_id = ?',
+                     (session_id, todo_id, user['sub'])).fetchone()
+    applied = row['seconds'] if row and not row['discarded'] else 0
+    db.execute(_FOCUS_DISCARD_SQL, (session_id, seconds, todo_id, user['sub']))
+    if applied:
+        db.execute(_FOCUS_SUBTRACT_SQL, (applied, todo_id, user['sub']))
+    todo = db.execute('SELECT focused_time, was_overdue, overdue_time FROM todos WHERE id = ? AND user_id = ?',
+                      (todo_id, user['sub'])).fetchone()
+    db.commit()
+    if todo is None:
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify({'result': 'success', 'focused_time': todo['focused_time'],
+                    'was_overdue': todo['was_overdue'], 'overdue_time': todo['overdue_time']})
+
+
+@app.route('/sync', methods=['POST'])
+def sync_focus_time():
+    """Accept a batch of focus heartbeats: {"updates": [{"id", "session_id", "seconds"}, ...]}.
+
+    `seconds` is the running total for that focus session, so resending the same
+    heartbeat is harmless and two tabs (two sessions) add up instead of overwriting.
+    """
+    user = session.get('user')
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True) or {}
+    updates = data.get('updates')
+    if not isinstance(updates, list) or len(updates) > MAX_SYNC_BATCH:
+        return jsonify({'error': f'updates must be a list of at most {MAX_SYNC_BATCH} items'}), 400
+
+    accepted = 0
+    for item in updates:
+        try:
+            todo_id = int(item['id'])
+            session_id = str(item['session_id'])[:64]
+            seconds = int(item['seconds'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if not session_id or seconds <= 0:
+            continue
+        focus_buffer.add(user['sub'], todo_id, session_id, min(seconds, MAX_SESSION_SECONDS))
+        accepted += 1
+
+    return jsonify({'result': 'success', 'accepted': accepted})
+
 if __name__ == '__main__':
     # When running locally, respect PORT/HOST/FLASK_DEBUG environment variables so behavior matches Render.
     port = int(os.environ.get('PORT', 5000))
     host = os.environ.get('HOST', '0.0.0.0')
     debug = os.environ.get('FLASK_DEBUG', '0') == '1'
-    # Ensure the database exists on first start (useful for first deploy on Render)
-    try:
-        if not os.path.exists(DATABASE):
-            init_db()
-        else:
-            ensure_was_overdue_column()
-    except Exception:
-        # If DB init fails for some reason, continue to start; surface errors in logs.
-        pass
-
+    if os.environ.get('AUTO_MIGRATE', '1') == '1':
+        migrate_on_boot()
     app.run(host=host, port=port, debug=debug)
\ No newline at end of file
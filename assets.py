@@ -0,0 +1,86 @@
+"""Fingerprinted, precompressed static assets.
+
+Every file under static/ is read once at startup, content-hashed and, for text
+types, gzip- (and brotli-, if the optional `brotli` package is installed)
+compressed ahead of time. url_for('static', ...) gets a ?v=<hash> parameter,
+so requests for the current version can be cached as immutable, and the view
+answers conditional and Range requests straight from memory.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+from dataclasses import dataclass, field
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are built without it
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Unversioned URLs (hardcoded paths, old pages) must revalidate, which is cheap thanks to the ETag.
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+COMPRESSIBLE_TYPES = {'application/javascript', 'text/javascript', 'application/json', 'image/svg+xml'}
+# Below this size compression is not worth the extra response variant.
+MIN_COMPRESS_SIZE = 512
+
+
+def _is_compressible(mimetype):
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+@dataclass
+class Asset:
+    path: str
+    mimetype: str
+    mtime: float
+    data: bytes
+    version: str
+    # content-coding -> encoded bytes, only for variants that came out smaller
+    encoded: dict = field(default_factory=dict)
+
+    def etag(self, encoding):
+        return self.version if encoding == 'identity' else f'{self.version}-{encoding}'
+
+    def pick_encoding(self, accept_encodings):
+        for encoding in ('br', 'gzip'):
+            if encoding in self.encoded and accept_encodings[encoding]:
+                return encoding
+        return 'identity'
+
+    def body(self, encoding):
+        return self.data if encoding == 'identity' else self.encoded[encoding]
+
+
+def load_asset(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    asset = Asset(
+        path=path,
+        mimetype=mimetype,
+        mtime=os.path.getmtime(path),
+        data=data,
+        version=hashlib.sha256(data).hexdigest()[:16],
+    )
+    if _is_compressible(mimetype) and len(data) >= MIN_COMPRESS_SIZE:
+        gz = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(gz) < len(data):
+            asset.encoded['gzip'] = gz
+        if brotli is not None:
+            br = brotli.compress(data, quality=11)
+            if len(br) < len(data):
+                asset.encoded['br'] = br
+    return asset
+
+
+def build_manifest(static_folder):
+    """Return {filename relative to static/ (with '/' separators): Asset}."""
+    manifest = {}
+    for root, _dirs, files in os.walk(static_folder):
+        for name in files:
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            manifest[rel] = load_asset(path)
+    return manifest
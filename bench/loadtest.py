@@ -0,0 +1,307 @@
+"""Load test for the todo endpoints against a real gunicorn process.
+
+Starts a local OpenID stub (oauth_stub.py) and gunicorn on a scratch SQLite
+database, seeds it, logs every simulated client in through the normal
+/login -> /authorize flow, and then has the clients drive /, /add, /toggle,
+/delete, /update_focus_time and /sync concurrently for a fixed duration.
+
+Per-endpoint throughput and p50/p95/p99 latency are printed and can be saved
+as a JSON baseline; later runs compared against it exit non-zero when an
+endpoint regresses past --threshold. Without --save-baseline a missing
+baseline is an error (exit 2), so a comparison can never pass vacuously.
+
+    python bench/loadtest.py --clients 32 --duration 30 --save-baseline
+    python bench/loadtest.py --clients 32 --duration 30   # compare with bench/baseline.json
+
+Baselines are machine-specific: record and compare them on the same host.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import requests
+
+from oauth_stub import USER_SUB_PREFIX, StubProvider
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, 'bench', 'baseline.json')
+
+# Relative frequency of each action per simulated client; timer traffic dominates.
+ACTION_WEIGHTS = {
+    '/update_focus_time': 30,
+    '/sync': 30,
+    '/': 10,
+    '/add': 10,
+    '/toggle': 10,
+    '/delete': 10,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the todo endpoints under concurrent load.')
+    parser.add_argument('--users', type=int, default=50, help='Users to seed.')
+    parser.add_argument('--todos-per-user', type=int, default=200, help='Todos seeded per user.')
+    parser.add_argument('--completed-ratio', type=float, default=0.8, help='Fraction of seeded todos marked completed.')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent simulated timer clients.')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds of measured load.')
+    parser.add_argument('--think-ms', type=float, default=0.0, help='Pause between requests of one client.')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes.')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker.')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for data and action mix.')
+    parser.add_argument('--output', help='Write the results JSON here.')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare against.')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline instead of comparing.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed relative regression in p95 latency or throughput (0.2 = 20%%).')
+    return parser.parse_args()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(args, port, db_path, provider, scratch):
+    env = dict(
+        os.environ,
+        DATABASE_PATH=db_path,
+        SECRET_KEY='bench-secret',
+        GOOGLE_CLIENT_ID='bench-client',
+        GOOGLE_CLIENT_SECRET='bench-secret',
+        OAUTH_SERVER_METADATA_URL=provider.metadata_url,
+        PROMETHEUS_MULTIPROC_DIR=os.path.join(scratch, 'metrics'),
+        # The stub listens on a new port each run; keep its cached metadata out of instance/.
+        OIDC_CACHE_DIR=os.path.join(scratch, 'oidc-cache'),
+    )
+    cmd = [
+        sys.executable, '-m', 'gunicorn', 'app:app', '--preload',
+        '--workers', str(args.workers), '--threads', str(args.threads),
+        '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+    ]
+    proc = subprocess.Popen(cmd, cwd=REPO_ROOT, env=env)
+    base = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f'gunicorn exited with status {proc.returncode}')
+        try:
+            if requests.get(base + '/', timeout=1).status_code == 200:
+                return proc, base
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit('gunicorn did not become ready within 30s')
+
+
+def seed_database(db_path, args, rng):
+    """Insert seeded todos directly; the schema already exists because gunicorn migrated it at boot."""
+    rows = []
+    for u in range(args.users):
+        for t in range(args.todos_per_user):
+            completed = 1 if rng.random() < args.completed_ratio else 0
+            hours, minutes = rng.randint(0, 2), rng.choice([15, 25, 30, 45])
+            focused = rng.randint(0, (hours * 3600 + minutes * 60) * 2)
+            total = hours * 3600 + minutes * 60
+            overdue = max(0, focused - total)
+            rows.append((f'{USER_SUB_PREFIX}{u}', f'seeded todo {t}', completed, hours, minutes,
+                         focused, 1 if overdue else 0, overdue))
+    db = sqlite3.connect(db_path, timeout=30)
+    with db:
+        db.executemany(
+            'INSERT INTO todos (user_id, text, completed, duration_hours, duration_minutes, focused_time, '
+            'was_overdue, overdue_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    db.close()
+    return len(rows)
+
+
+class Client:
+    """One simulated browser tab with a running focus timer."""
+
+    def __init__(self, base, rng, samples, lock):
+        self.base = base
+        self.rng = rng
+        self.samples = samples
+        self.lock = lock
+        self.http = requests.Session()
+        self.todo_ids = []
+        self.focused = defaultdict(int)
+        self.session_id = uuid.uuid4().hex
+        self.session_seconds = 0
+
+    def login(self):
+        resp = self.http.get(self.base + '/login', timeout=30)
+        resp.raise_for_status()
+        page = self.http.get(self.base + '/api/todos', params={'status': 'active', 'limit': 200}, timeout=30)
+        page.raise_for_status()
+        self.todo_ids = [t['id'] for t in page.json()['todos']]
+
+    def _request(self, name, method, path, **kwargs):
+        started = time.perf_counter()
+        ok = False
+        data = None
+        try:
+            resp = self.http.request(method, self.base + path, timeout=30, **kwargs)
+            ok = resp.status_code < 400
+            if ok and resp.headers.get('Content-Type', '').startswith('application/json'):
+                data = resp.json()
+        except requests.RequestException:
+            pass
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.samples[name].append((elapsed, ok))
+        return data
+
+    def step(self):
+        action = self.rng.choices(list(ACTION_WEIGHTS), weights=list(ACTION_WEIGHTS.values()))[0]
+        if action != '/add' and action != '/' and not self.todo_ids:
+            action = '/add'
+        if action == '/':
+            self._request(action, 'GET', '/')
+        elif action == '/add':
+            data = self._request(action, 'POST', '/add', json={
+                'text': 'bench todo', 'duration_hours': '0', 'duration_minutes': '25'})
+            if data and 'id' in data:
+                self.todo_ids.append(data['id'])
+        elif action == '/update_focus_time':
+            todo_id = self.rng.choice(self.todo_ids)
+            self.focused[todo_id] += self.rng.randint(1, 60)
+            self._request(action, 'POST', '/update_focus_time', json={'id': todo_id, 'focused_time': self.focused[todo_id]})
+        elif action == '/sync':
+            self.session_seconds += self.rng.randint(1, 30)
+            updates = [{'id': todo_id, 'session_id': self.session_id, 'seconds': self.session_seconds}
+                       for todo_id in self.rng.sample(self.todo_ids, min(3, len(self.todo_ids)))]
+            self._request(action, 'POST', '/sync', json={'updates': updates})
+        elif action == '/toggle':
+            self._request(action, 'POST', '/toggle', json={'id': self.rng.choice(self.todo_ids)})
+        elif action == '/delete':
+            todo_id = self.todo_ids.pop(self.rng.randrange(len(self.todo_ids)))
+            self._request(action, 'POST', '/delete', json={'id': todo_id})
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples, duration):
+    endpoints = {}
+    for name, values in sorted(samples.items()):
+        latencies = sorted(v[0] for v in values)
+        errors = sum(1 for v in values if not v[1])
+        endpoints[name] = {
+            'count': len(values),
+            'errors': errors,
+            'rps': round(len(values) / duration, 2),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        }
+    return endpoints
+
+
+def print_report(endpoints):
+    print(f"{'endpoint':<20}{'count':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, s in endpoints.items():
+        print(f"{name:<20}{s['count']:>8}{s['errors']:>8}{s['rps']:>10}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}")
+
+
+def compare(results, baseline, threshold):
+    """Return a list of human-readable regressions of `results` against `baseline`."""
+    problems = []
+    if baseline.get('config') != results['config']:
+        print('warning: baseline was recorded with a different configuration', file=sys.stderr)
+    for name, base in baseline.get('endpoints', {}).items():
+        cur = results['endpoints'].get(name)
+        if cur is None:
+            problems.append(f'{name}: no samples in this run')
+            continue
+        if base['p95_ms'] > 0 and cur['p95_ms'] > base['p95_ms'] * (1 + threshold):
+            problems.append(f"{name}: p95 {cur['p95_ms']} ms vs baseline {base['p95_ms']} ms")
+        if base['rps'] > 0 and cur['rps'] < base['rps'] * (1 - threshold):
+            problems.append(f"{name}: {cur['rps']} req/s vs baseline {base['rps']} req/s")
+        if cur['count'] and cur['errors'] / cur['count'] > 0.01:
+            problems.append(f"{name}: {cur['errors']} errors out of {cur['count']} requests")
+    return problems
+
+
+def main():
+    args = parse_args()
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}; run with --save-baseline to record one.', file=sys.stderr)
+        return 2
+    rng = random.Random(args.seed)
+    scratch = tempfile.mkdtemp(prefix='todo-bench-')
+    db_path = os.path.join(scratch, 'bench.db')
+    provider = StubProvider(users=max(args.users, args.clients)).start()
+    proc = None
+    try:
+        proc, base = start_gunicorn(args, free_port(), db_path, provider, scratch)
+        seeded = seed_database(db_path, args, rng)
+        print(f'Seeded {seeded} todos for {args.users} users; starting {args.clients} clients against {base}')
+
+        samples = defaultdict(list)
+        lock = threading.Lock()
+        clients = [Client(base, random.Random(rng.random()), samples, lock) for _ in range(args.clients)]
+        for client in clients:
+            client.login()
+
+        deadline = time.monotonic() + args.duration
+        start_barrier = threading.Barrier(len(clients))
+
+        def run(client):
+            start_barrier.wait()
+            while time.monotonic() < deadline:
+                client.step()
+                if args.think_ms:
+                    time.sleep(args.think_ms / 1000.0)
+
+        threads = [threading.Thread(target=run, args=(c,)) for c in clients]
+        started = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - started
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        provider.stop()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    config = {k: getattr(args, k) for k in ('users', 'todos_per_user', 'completed_ratio', 'clients',
+                                            'duration', 'think_ms', 'workers', 'threads', 'seed')}
+    results = {'config': config, 'endpoints': summarize(samples, elapsed)}
+    print_report(results['endpoints'])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Saved baseline to {args.baseline}')
+        return 0
+    with open(args.baseline) as f:
+        problems = compare(results, json.load(f), args.threshold)
+    for problem in problems:
+        print(f'REGRESSION {problem}', file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""Minimal local OpenID Connect provider for benchmarks and offline runs.
+
+Implements just enough of the authorization-code flow for Authlib's Flask
+client: discovery, /authorize (redirects straight back, no login page),
+/token (HS256-signed id_token), /jwks and /userinfo. Point the app at it with
+OAUTH_SERVER_METADATA_URL=http://127.0.0.1:<port>/.well-known/openid-configuration.
+
+Users are handed out round-robin as bench-user-0 .. bench-user-<users-1>,
+so the N-th login gets bench-user-N (mod users). `requests` counts hits per
+path and rotate_key() switches to a new signing key, for cache tests.
+"""
+import argparse
+import base64
+import itertools
+import json
+import secrets
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from authlib.jose import jwt
+
+USER_SUB_PREFIX = 'bench-user-'
+
+
+class StubProvider:
+    def __init__(self, host='127.0.0.1', port=0, users=1):
+        self.users = users
+        self.signing_key = secrets.token_bytes(32)
+        self.kid = 'stub'
+        self._key_versions = itertools.count(1)
+        self.requests = Counter()
+        self._codes = {}
+        self._tokens = {}
+        self._next_user = itertools.count()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.issuer = f'http://{host}:{self.server.server_address[1]}'
+        self._thread = None
+
+    @property
+    def metadata_url(self):
+        return f'{self.issuer}/.well-known/openid-configuration'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='oauth-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def rotate_key(self):
+        """Sign new id_tokens with a fresh key under a new kid; /jwks only publishes the new one."""
+        with self._lock:
+            self.signing_key = secrets.token_bytes(32)
+            self.kid = f'stub-{next(self._key_versions)}'
+
+    def metadata(self):
+        return {
+            'issuer': self.issuer,
+            'authorization_endpoint': f'{self.issuer}/authorize',
+            'token_endpoint': f'{self.issuer}/token',
+            'userinfo_endpoint': f'{self.issuer}/userinfo',
+            'jwks_uri': f'{self.issuer}/jwks',
+            'response_types_supported': ['code'],
+            'subject_types_supported': ['public'],
+            'id_token_signing_alg_values_supported': ['HS256'],
+        }
+
+    def jwks(self):
+        k = base64.urlsafe_b64encode(self.signing_key).rstrip(b'=').decode()
+        return {'keys': [{'kty': 'oct', 'kid': self.kid, 'alg': 'HS256', 'k': k}]}
+
+    def userinfo(self, sub):
+        n = sub[len(USER_SUB_PREFIX):]
+        return {'sub': sub, 'name': f'Bench User {n}', 'email': f'{sub}@example.test', 'email_verified': True}
+
+    def issue_code(self, client_id, nonce):
+        with self._lock:
+            sub = f'{USER_SUB_PREFIX}{next(self._next_user) % self.users}'
+            code = secrets.token_urlsafe(16)
+            self._codes[code] = (sub, client_id, nonce)
+        return code
+
+    def exchange_code(self, code):
+        with self._lock:
+            entry = self._codes.pop(code, None)
+        if entry is None:
+            return None
+        sub, client_id, nonce = entry
+        now = int(time.time())
+        claims = dict(self.userinfo(sub), iss=self.issuer, aud=client_id, iat=now, exp=now + 3600)
+        if nonce:
+            claims['nonce'] = nonce
+        id_token = jwt.encode({'alg': 'HS256', 'kid': self.kid}, claims, self.signing_key).decode()
+        access_token = secrets.token_urlsafe(16)
+        with self._lock:
+            self._tokens[access_token] = sub
+        return {'access_token': access_token, 'token_type': 'Bearer', 'expires_in': 3600, 'id_token': id_token}
+
+    def sub_for_token(self, access_token):
+        with self._lock:
+            return self._tokens.get(access_token)
+
+    def _handler_class(self):
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _json(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                with provider._lock:
+                    provider.requests[url.path] += 1
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path == '/.well-known/openid-configuration':
+                    self._json(provider.metadata())
+                elif url.path == '/jwks':
+                    self._json(provider.jwks())
+                elif url.path == '/authorize':
+                    code = provider.issue_code(query.get('client_id'), query.get('nonce'))
+                    params = {'code': code}
+                    if 'state' in query:
+                        params['state'] = query['state']
+                    self.send_response(302)
+                    self.send_header('Location', f"{query['redirect_uri']}?{urlencode(params)}")
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                elif url.path == '/userinfo':
+                    auth = self.headers.get('Authorization', '')
+                    sub = provider.sub_for_token(auth.removeprefix('Bearer ').strip())
+                    if sub is None:
+                        self._json({'error': 'invalid_token'}, 401)
+                    else:
+                        self._json(provider.userinfo(sub))
+                else:
+                    self._json({'error': 'not_found'}, 404)
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                with provider._lock:
+                    provider.requests[url.path] += 1
+                length = int(self.headers.get('Content-Length') or 0)
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+                if url.path != '/token':
+                    self._json({'error': 'not_found'}, 404)
+                    return
+                token = provider.exchange_code(form.get('code'))
+                if token is None:
+                    self._json({'error': 'invalid_grant'}, 400)
+                else:
+                    self._json(token)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--users', type=int, default=1)
+    args = parser.parse_args()
+    provider = StubProvider(args.host, args.port, args.users)
+    print(f'OAUTH_SERVER_METADATA_URL={provider.metadata_url}')
+    try:
+        provider.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
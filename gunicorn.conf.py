@@ -0,0 +1,35 @@
+# Loaded automatically by gunicorn from the working directory (and again on HUP).
+import os
+import shutil
+import tempfile
+
+# Metrics from every worker are written here and merged by /metrics. This must be
+# set before the app (and prometheus_client) is imported, and the directory must
+# start empty so samples from a previous run are not reported again. Unless the
+# operator supplies one (which is then theirs to empty, and is never deleted
+# here), each master gets a fresh private directory that it removes on exit.
+if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='todoapp-metrics-')
+    # Survives the config being re-read on HUP, when the variable is already set.
+    os.environ['TODOAPP_OWNS_METRICS_DIR'] = os.environ['PROMETHEUS_MULTIPROC_DIR']
+else:
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], mode=0o700, exist_ok=True)
+
+
+def on_starting(server):
+    # Runs once in the master before any worker is forked (after the app import
+    # under --preload). An exception here aborts the boot.
+    if os.environ.get('AUTO_MIGRATE', '1') == '1':
+        from app import migrate_on_boot
+        migrate_on_boot()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    owned = os.environ.get('TODOAPP_OWNS_METRICS_DIR')
+    if owned and owned == os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        shutil.rmtree(owned, ignore_errors=True)
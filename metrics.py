@@ -0,0 +1,122 @@
+"""Prometheus metrics for the todo app.
+
+When PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py does this) every worker
+writes its samples to that directory and /metrics aggregates all of them.
+The variable has to be set before prometheus_client is first imported.
+/metrics itself is only served when METRICS_TOKEN is set (see app.py).
+"""
+import logging
+import os
+import sqlite3
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+# Log statements slower than this many milliseconds (0 disables the slow-query log).
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 0))
+
+slow_query_logger = logging.getLogger('todoapp.slow_queries')
+
+REQUEST_LATENCY = Histogram(
+    'todoapp_request_duration_seconds', 'Time spent handling a request, by endpoint.',
+    ['endpoint', 'method'],
+)
+REQUESTS = Counter(
+    'todoapp_requests_total', 'Requests handled, by endpoint and status code.',
+    ['endpoint', 'method', 'status'],
+)
+SQL_LATENCY = Histogram(
+    'todoapp_sql_statement_duration_seconds', 'Time spent executing SQLite statements, by statement type.',
+    ['operation'],
+    buckets=(.0001, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5),
+)
+SQL_LOCK_WAIT = Histogram(
+    'todoapp_sql_lock_wait_seconds', 'Time spent acquiring the SQLite write lock (BEGIN IMMEDIATE/EXCLUSIVE).',
+    buckets=(.0001, .001, .005, .01, .05, .1, .25, .5, 1, 2.5, 5),
+)
+SQL_LOCK_ERRORS = Counter(
+    'todoapp_sql_lock_errors_total', 'Statements that failed with "database is locked" after busy_timeout.',
+)
+OAUTH_LATENCY = Histogram(
+    'todoapp_oauth_duration_seconds', 'Time spent in calls to the OAuth provider, by step.',
+    ['step'],
+)
+SCHEMA_MIGRATION_LATENCY = Histogram(
+    'todoapp_schema_migration_duration_seconds', 'Time spent checking and applying schema migrations at boot.',
+)
+
+_SQL_OPERATIONS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'BEGIN', 'COMMIT', 'ROLLBACK', 'PRAGMA', 'CREATE', 'DROP', 'ALTER'}
+
+
+def _operation(sql):
+    head = sql.lstrip().split(None, 1)
+    op = head[0].upper() if head else ''
+    return op if op in _SQL_OPERATIONS else 'OTHER'
+
+
+def _observe(sql, started, failed):
+    elapsed = time.perf_counter() - started
+    op = _operation(sql)
+    SQL_LATENCY.labels(op).observe(elapsed)
+    if op == 'BEGIN' and ('IMMEDIATE' in sql.upper() or 'EXCLUSIVE' in sql.upper()):
+        SQL_LOCK_WAIT.observe(elapsed)
+    if isinstance(failed, sqlite3.OperationalError) and 'locked' in str(failed):
+        SQL_LOCK_ERRORS.inc()
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_query_logger.warning('slow query (%.1f ms): %s', elapsed * 1000, ' '.join(sql.split()))
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times every execute call (time to first row for SELECTs)."""
+
+    def execute(self, sql, parameters=()):
+        started, failed = time.perf_counter(), None
+        try:
+            return super().execute(sql, parameters)
+        except Exception as e:
+            failed = e
+            raise
+        finally:
+            _observe(sql, started, failed)
+
+    def executemany(self, sql, seq_of_parameters):
+        started, failed = time.perf_counter(), None
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        except Exception as e:
+            failed = e
+            raise
+        finally:
+            _observe(sql, started, failed)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection factory for sqlite3.connect() that routes all statements through InstrumentedCursor."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def begin_immediate(self):
+        """Open a write transaction up front unless one is already open.
+
+        With sqlite3's implicit deferred BEGIN the wait for the write lock happens inside
+        the first INSERT/UPDATE/DELETE; taking it here is what SQL_LOCK_WAIT measures.
+        """
+        if not self.in_transaction:
+            self.execute('BEGIN IMMEDIATE')
+
+
+def render_metrics():
+    """Return (body, content_type) in Prometheus text format, aggregated across workers if configured."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,2 @@
+ALTER TABLE todos ADD COLUMN was_overdue INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE todos ADD COLUMN overdue_time INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_todos_user_id ON todos (user_id);
@@ -0,0 +1,15 @@
+-- Per-session focus totals reported through /sync. `seconds` is the highest
+-- cumulative value seen for the session (so replays are no-ops) and `pending`
+-- is the part not yet folded into todos.focused_time.
+CREATE TABLE IF NOT EXISTS focus_sessions (
+    session_id TEXT NOT NULL,
+    todo_id INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    seconds INTEGER NOT NULL DEFAULT 0,
+    pending INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (session_id, todo_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_focus_sessions_pending ON focus_sessions (todo_id) WHERE pending > 0;
+CREATE INDEX IF NOT EXISTS idx_focus_sessions_updated_at ON focus_sessions (updated_at);
@@ -0,0 +1,5 @@
+-- Covers the per-user active/completed listings and keyset pagination by id.
+-- Dropping idx_todos_user_id here was a mistake (status=all needs it for id
+-- order); 0010 restores it.
+CREATE INDEX IF NOT EXISTS idx_todos_user_completed_id ON todos (user_id, completed, id);
+DROP INDEX IF EXISTS idx_todos_user_id;
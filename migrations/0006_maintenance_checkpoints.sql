@@ -0,0 +1,7 @@
+-- Progress markers for long-running maintenance commands, so an interrupted
+-- run can resume where it stopped.
+CREATE TABLE IF NOT EXISTS maintenance_checkpoints (
+    name TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,90 @@
+-- Per-user aggregates kept current by triggers on todos, so /api/stats never
+-- scans a user's todos. user_stats reflects the todos that currently exist;
+-- user_daily_stats is an activity log (focus seconds added and completions
+-- made per UTC day) and is not rewound when todos are deleted.
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id TEXT PRIMARY KEY,
+    total_todos INTEGER NOT NULL DEFAULT 0,
+    completed_todos INTEGER NOT NULL DEFAULT 0,
+    overdue_todos INTEGER NOT NULL DEFAULT 0,
+    total_focus_seconds INTEGER NOT NULL DEFAULT 0,
+    total_overdue_seconds INTEGER NOT NULL DEFAULT 0,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    longest_streak INTEGER NOT NULL DEFAULT 0,
+    last_active_day TEXT
+);
+
+CREATE TABLE IF NOT EXISTS user_daily_stats (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    focus_seconds INTEGER NOT NULL DEFAULT 0,
+    completed_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+);
+
+CREATE TRIGGER IF NOT EXISTS todos_stats_insert AFTER INSERT ON todos
+BEGIN
+    INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.user_id);
+    UPDATE user_stats SET
+        total_todos = total_todos + 1,
+        completed_todos = completed_todos + (NEW.completed != 0),
+        overdue_todos = overdue_todos + (NEW.was_overdue != 0),
+        total_focus_seconds = total_focus_seconds + NEW.focused_time,
+        total_overdue_seconds = total_overdue_seconds + NEW.overdue_time
+    WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS todos_stats_delete AFTER DELETE ON todos
+BEGIN
+    UPDATE user_stats SET
+        total_todos = total_todos - 1,
+        completed_todos = completed_todos - (OLD.completed != 0),
+        overdue_todos = overdue_todos - (OLD.was_overdue != 0),
+        total_focus_seconds = total_focus_seconds - OLD.focused_time,
+        total_overdue_seconds = total_overdue_seconds - OLD.overdue_time
+    WHERE user_id = OLD.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS todos_stats_update AFTER UPDATE OF completed, focused_time, was_overdue, overdue_time ON todos
+BEGIN
+    INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.user_id);
+    UPDATE user_stats SET
+        completed_todos = completed_todos + (NEW.completed != 0) - (OLD.completed != 0),
+        overdue_todos = overdue_todos + (NEW.was_overdue != 0) - (OLD.was_overdue != 0),
+        total_focus_seconds = total_focus_seconds + NEW.focused_time - OLD.focused_time,
+        total_overdue_seconds = total_overdue_seconds + NEW.overdue_time - OLD.overdue_time
+    WHERE user_id = NEW.user_id;
+
+    INSERT INTO user_daily_stats (user_id, day, focus_seconds, completed_count)
+    SELECT NEW.user_id, date('now'), NEW.focused_time - OLD.focused_time, (NEW.completed != 0 AND OLD.completed = 0)
+    WHERE NEW.focused_time != OLD.focused_time OR (NEW.completed != 0 AND OLD.completed = 0)
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        focus_seconds = focus_seconds + excluded.focus_seconds,
+        completed_count = completed_count + excluded.completed_count;
+
+    -- A day counts toward the streak once the user adds focus time or completes a todo.
+    UPDATE user_stats SET
+        current_streak = CASE
+            WHEN last_active_day = date('now') THEN current_streak
+            WHEN last_active_day = date('now', '-1 day') THEN current_streak + 1
+            ELSE 1
+        END,
+        last_active_day = date('now')
+    WHERE user_id = NEW.user_id
+      AND (NEW.focused_time > OLD.focused_time OR (NEW.completed != 0 AND OLD.completed = 0));
+    UPDATE user_stats SET longest_streak = current_streak
+    WHERE user_id = NEW.user_id AND current_streak > longest_streak;
+END;
+
+-- Existing todos predate the triggers; seed the totals from them (`flask backfill-stats`
+-- keeps its own copy of this statement, maintained for the current schema).
+INSERT INTO user_stats (user_id, total_todos, completed_todos, overdue_todos, total_focus_seconds, total_overdue_seconds)
+SELECT user_id, COUNT(*), SUM(completed != 0), SUM(was_overdue != 0), SUM(focused_time), SUM(overdue_time)
+FROM todos WHERE 1
+GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET
+    total_todos = excluded.total_todos,
+    completed_todos = excluded.completed_todos,
+    overdue_todos = excluded.overdue_todos,
+    total_focus_seconds = excluded.total_focus_seconds,
+    total_overdue_seconds = excluded.total_overdue_seconds;
@@ -0,0 +1,3 @@
+-- Sessions taken back by the Pomodoro reset. Heartbeats for a discarded session
+-- (still buffered in some worker, or retried by the client) add nothing.
+ALTER TABLE focus_sessions ADD COLUMN discarded INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,5 @@
+-- 0005 dropped this as redundant, but it is not: with status=all the listing
+-- filters on user_id alone, and (user_id, completed, id) cannot return those
+-- rows in id order, so SQLite sorted them in a temp b-tree. An index on
+-- (user_id) carries the rowid (id) as its implicit last column.
+CREATE INDEX IF NOT EXISTS idx_todos_user_id ON todos (user_id);
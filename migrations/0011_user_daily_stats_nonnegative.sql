@@ -0,0 +1,40 @@
+-- user_daily_stats logs focus time *added*. The 0007 trigger logged every
+-- focused_time change, so `flask fix-focused-times` (ms -> s) and progress
+-- resets wrote large negative focus_seconds into the day they ran. Totals in
+-- user_stats still follow every change; only increases go to the daily log.
+DROP TRIGGER IF EXISTS todos_stats_update;
+
+CREATE TRIGGER todos_stats_update AFTER UPDATE OF completed, focused_time, was_overdue, overdue_time ON todos
+BEGIN
+    INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.user_id);
+    UPDATE user_stats SET
+        completed_todos = completed_todos + (NEW.completed != 0) - (OLD.completed != 0),
+        overdue_todos = overdue_todos + (NEW.was_overdue != 0) - (OLD.was_overdue != 0),
+        total_focus_seconds = total_focus_seconds + NEW.focused_time - OLD.focused_time,
+        total_overdue_seconds = total_overdue_seconds + NEW.overdue_time - OLD.overdue_time
+    WHERE user_id = NEW.user_id;
+
+    INSERT INTO user_daily_stats (user_id, day, focus_seconds, completed_count)
+    SELECT NEW.user_id, date('now'), MAX(0, NEW.focused_time - OLD.focused_time), (NEW.completed != 0 AND OLD.completed = 0)
+    WHERE NEW.focused_time > OLD.focused_time OR (NEW.completed != 0 AND OLD.completed = 0)
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        focus_seconds = focus_seconds + excluded.focus_seconds,
+        completed_count = completed_count + excluded.completed_count;
+
+    -- A day counts toward the streak once the user adds focus time or completes a todo.
+    UPDATE user_stats SET
+        current_streak = CASE
+            WHEN last_active_day = date('now') THEN current_streak
+            WHEN last_active_day = date('now', '-1 day') THEN current_streak + 1
+            ELSE 1
+        END,
+        last_active_day = date('now')
+    WHERE user_id = NEW.user_id
+      AND (NEW.focused_time > OLD.focused_time OR (NEW.completed != 0 AND OLD.completed = 0));
+    UPDATE user_stats SET longest_streak = current_streak
+    WHERE user_id = NEW.user_id AND current_streak > longest_streak;
+END;
+
+-- The decreases already logged cannot be told apart from real activity; at
+-- least stop days from reporting negative focus time.
+UPDATE user_daily_stats SET focus_seconds = 0 WHERE focus_seconds < 0;
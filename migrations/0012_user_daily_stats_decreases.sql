@@ -0,0 +1,56 @@
+-- 0011 kept every decrease out of user_daily_stats, so a focus session taken
+-- back with /discard_focus_session still counted for its day and its streak.
+-- Decreases are logged again, against the same day and clamped at zero; only
+-- data repairs (which hold a row in stats_log_suspended for the length of
+-- their own transaction) stay out of the log.
+CREATE TABLE IF NOT EXISTS stats_log_suspended (
+    reason TEXT PRIMARY KEY
+);
+
+DROP TRIGGER IF EXISTS todos_stats_update;
+
+CREATE TRIGGER todos_stats_update AFTER UPDATE OF completed, focused_time, was_overdue, overdue_time ON todos
+BEGIN
+    INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.user_id);
+    UPDATE user_stats SET
+        completed_todos = completed_todos + (NEW.completed != 0) - (OLD.completed != 0),
+        overdue_todos = overdue_todos + (NEW.was_overdue != 0) - (OLD.was_overdue != 0),
+        total_focus_seconds = total_focus_seconds + NEW.focused_time - OLD.focused_time,
+        total_overdue_seconds = total_overdue_seconds + NEW.overdue_time - OLD.overdue_time
+    WHERE user_id = NEW.user_id;
+
+    INSERT OR IGNORE INTO user_daily_stats (user_id, day)
+    SELECT NEW.user_id, date('now')
+    WHERE (NEW.focused_time != OLD.focused_time OR (NEW.completed != 0 AND OLD.completed = 0))
+      AND NOT EXISTS (SELECT 1 FROM stats_log_suspended);
+    UPDATE user_daily_stats SET
+        focus_seconds = MAX(0, focus_seconds + NEW.focused_time - OLD.focused_time),
+        completed_count = completed_count + (NEW.completed != 0 AND OLD.completed = 0)
+    WHERE user_id = NEW.user_id AND day = date('now')
+      AND NOT EXISTS (SELECT 1 FROM stats_log_suspended);
+
+    -- A day counts toward the streak once the user adds focus time or completes a todo.
+    UPDATE user_stats SET
+        current_streak = CASE
+            WHEN last_active_day = date('now') THEN current_streak
+            WHEN last_active_day = date('now', '-1 day') THEN current_streak + 1
+            ELSE 1
+        END,
+        last_active_day = date('now')
+    WHERE user_id = NEW.user_id
+      AND (NEW.focused_time > OLD.focused_time OR (NEW.completed != 0 AND OLD.completed = 0))
+      AND NOT EXISTS (SELECT 1 FROM stats_log_suspended);
+    UPDATE user_stats SET longest_streak = current_streak
+    WHERE user_id = NEW.user_id AND current_streak > longest_streak;
+
+    -- ...and stops counting if that activity is taken back entirely. A streak only
+    -- grows from an active yesterday, so that is where it falls back to.
+    UPDATE user_stats SET
+        current_streak = current_streak - 1,
+        last_active_day = CASE WHEN current_streak > 1 THEN date('now', '-1 day') END
+    WHERE user_id = NEW.user_id
+      AND NEW.focused_time < OLD.focused_time
+      AND last_active_day = date('now')
+      AND EXISTS (SELECT 1 FROM user_daily_stats
+                  WHERE user_id = NEW.user_id AND day = date('now') AND focus_seconds = 0 AND completed_count = 0);
+END;
@@ -0,0 +1,131 @@
+"""On-disk cache for OpenID Connect discovery metadata and JWKS.
+
+Authlib fetches the discovery document and JWKS once per process and then
+keeps them forever. This client shares them through a JSON file (so every
+gunicorn worker, and the next deploy, skips the round trips on first login)
+and re-fetches once they are older than the TTL. An unknown signing key
+still forces an immediate JWKS refresh, as in Authlib.
+
+The cached JWKS decides which id_tokens are accepted, so the cache directory
+must be private to the app: it is created with mode 0700, and a directory or
+cache file that is not owned by the current user, or is writable by others,
+is ignored in favour of fetching from the provider.
+"""
+import hashlib
+import json
+import logging
+import os
+import stat
+import tempfile
+import time
+
+from authlib.integrations.flask_client import FlaskOAuth2App, OAuth
+
+OIDC_METADATA_TTL = int(os.environ.get('OIDC_METADATA_TTL', 24 * 3600))
+
+logger = logging.getLogger('todoapp.oidc_cache')
+
+
+def _is_private(st):
+    if not hasattr(os, 'getuid'):  # no ownership to check (Windows)
+        return True
+    return st.st_uid == os.getuid() and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+class CachedMetadataOAuth2App(FlaskOAuth2App):
+    """Authlib client with two extra register() options: metadata_cache_dir
+    (None keeps the cache in memory only) and metadata_ttl in seconds."""
+
+    def __init__(self, *args, metadata_cache_dir=None, metadata_ttl=OIDC_METADATA_TTL, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metadata_cache_dir = metadata_cache_dir
+        self.metadata_ttl = metadata_ttl
+
+    def _cache_path(self):
+        key = hashlib.sha256(self._server_metadata_url.encode()).hexdigest()[:16]
+        return os.path.join(self.metadata_cache_dir, f'{key}.json')
+
+    def _cache_dir_usable(self, create=False):
+        if not self.metadata_cache_dir:
+            return False
+        try:
+            if create:
+                os.makedirs(self.metadata_cache_dir, mode=0o700, exist_ok=True)
+            st = os.lstat(self.metadata_cache_dir)
+        except OSError:
+            return False
+        if not stat.S_ISDIR(st.st_mode) or not _is_private(st):
+            logger.warning('oidc: not using cache dir %s: it must be a directory owned by this user '
+                           'and not writable by others', self.metadata_cache_dir)
+            return False
+        return True
+
+    def _read_cache(self):
+        if not self._cache_dir_usable():
+            return None
+        try:
+            fd = os.open(self._cache_path(), os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0))
+        except OSError:
+            return None
+        try:
+            with os.fdopen(fd, encoding='utf8') as f:
+                if not _is_private(os.fstat(f.fileno())):
+                    logger.warning('oidc: ignoring cache file %s: not owned by this user or writable by others',
+                                   self._cache_path())
+                    return None
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get('fetched_at', 0) >= self.metadata_ttl:
+            return None
+        return entry
+
+    def _write_cache(self, entry):
+        if not self._cache_dir_usable(create=True):
+            return
+        # Write-then-rename so concurrent workers never read a partial file (mkstemp creates it 0600).
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.metadata_cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf8') as f:
+                json.dump(entry, f)
+            os.replace(tmp, self._cache_path())
+        except OSError:
+            pass
+
+    def _fetch_json(self, url):
+        with self.client_cls(**self.client_kwargs) as session:
+            resp = session.request('GET', url, withhold_token=True)
+            resp.raise_for_status()
+            return resp.json()
+
+    def load_server_metadata(self):
+        if not self._server_metadata_url:
+            return self.server_metadata
+        loaded_at = self.server_metadata.get('_loaded_at')
+        if loaded_at is not None and time.time() - loaded_at < self.metadata_ttl:
+            return self.server_metadata
+
+        entry = self._read_cache()
+        if entry is None:
+            entry = {'fetched_at': time.time(), 'metadata': self._fetch_json(self._server_metadata_url)}
+            self._write_cache(entry)
+        self.server_metadata.pop('jwks', None)
+        self.server_metadata.update(entry['metadata'])
+        if 'jwks' in entry:
+            self.server_metadata['jwks'] = entry['jwks']
+        self.server_metadata['_loaded_at'] = entry['fetched_at']
+        return self.server_metadata
+
+    def fetch_jwk_set(self, force=False):
+        metadata = self.load_server_metadata()
+        if metadata.get('jwks') and not force:
+            return metadata['jwks']
+        jwk_set = super().fetch_jwk_set(force=True)
+        if self._server_metadata_url:
+            metadata_only = {k: v for k, v in metadata.items() if k != 'jwks' and not k.startswith('_')}
+            self._write_cache({'fetched_at': metadata['_loaded_at'], 'metadata': metadata_only, 'jwks': jwk_set})
+        return jwk_set
+
+
+class CachingOAuth(OAuth):
+    oauth2_client_cls = CachedMetadataOAuth2App
@@ -1,11 +1,10 @@
+-- Tables are created by the numbered files in migrations/; init-db drops
+-- everything here and then replays them from scratch.
+DROP TABLE IF EXISTS user_daily_stats;
+DROP TABLE IF EXISTS user_stats;
+DROP TABLE IF EXISTS stats_log_suspended;
+DROP TABLE IF EXISTS focus_sessions;
 DROP TABLE IF EXISTS todos;
-
-CREATE TABLE todos (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id TEXT NOT NULL,
-    text TEXT NOT NULL,
-    completed INTEGER NOT NULL DEFAULT 0,
-    duration_hours INTEGER,
-    duration_minutes INTEGER,
-    focused_time INTEGER NOT NULL DEFAULT 0
-);
\ No newline at end of file
+DROP TABLE IF EXISTS sessions;
+DROP TABLE IF EXISTS maintenance_checkpoints;
+DROP TABLE IF EXISTS schema_version;
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""Server-side sessions: the cookie carries only a signed session id.
+
+Session data lives in a pluggable store (SQLite by default) behind a small
+per-process LRU cache. A session gets a fresh id every time its data changes,
+so a cached entry is never out of date, only possibly deleted; the cache TTL
+bounds how long a deleted session can still be seen by another worker.
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+from itsdangerous import BadSignature, Signer
+
+
+class ServerSideSession(SecureCookieSession):
+    def __init__(self, initial=None, sid=None, refresh=False):
+        super().__init__(initial)
+        self.sid = sid
+        self.new = sid is None
+        # set when the stored expiry should be pushed forward on save
+        self.refresh = refresh
+
+
+class SQLiteSessionStore:
+    """Stores sessions in the `sessions` table through the app's pooled connection.
+
+    Sessions are saved after the view has run, on the request's own connection
+    (even for a 500). A transaction still open at that point belongs to a view that
+    failed or never committed; it is rolled back, as teardown would have done,
+    rather than committed along with the session. Writes then open their
+    transaction with db.begin_immediate() (see metrics.InstrumentedConnection) so
+    time spent waiting for the write lock is reported as lock wait.
+    """
+
+    def __init__(self, get_db):
+        self.get_db = get_db
+
+    def _write(self, sql, params):
+        db = self.get_db()
+        if db.in_transaction:
+            db.rollback()
+        db.begin_immediate()
+        rowcount = db.execute(sql, params).rowcount
+        db.commit()
+        return rowcount
+
+    def load(self, sid):
+        row = self.get_db().execute('SELECT data, expires_at FROM sessions WHERE id = ?', (sid,)).fetchone()
+        return (row['data'], row['expires_at']) if row else None
+
+    def save(self, sid, data, expires_at):
+        self._write('INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)', (sid, data, expires_at))
+
+    def touch(self, sid, expires_at):
+        self._write('UPDATE sessions SET expires_at = ? WHERE id = ?', (expires_at, sid))
+
+    def delete(self, sid):
+        self._write('DELETE FROM sessions WHERE id = ?', (sid,))
+
+    def sweep(self, now):
+        return self._write('DELETE FROM sessions WHERE expires_at <= ?', (now,))
+
+
+class CachedSessionStore:
+    """In-memory LRU in front of another store."""
+
+    def __init__(self, store, max_entries=1024, ttl=30):
+        self.store = store
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, sid, data, expires_at):
+        with self._lock:
+            self._entries[sid] = (data, expires_at, time.monotonic())
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def load(self, sid):
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is not None and time.monotonic() - entry[2] < self.ttl:
+                self._entries.move_to_end(sid)
+                return entry[0], entry[1]
+        loaded = self.store.load(sid)
+        if loaded is None:
+            with self._lock:
+                self._entries.pop(sid, None)
+        else:
+            self._remember(sid, *loaded)
+        return loaded
+
+    def save(self, sid, data, expires_at):
+        self.store.save(sid, data, expires_at)
+        self._remember(sid, data, expires_at)
+
+    def touch(self, sid, expires_at):
+        self.store.touch(sid, expires_at)
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is not None:
+                self._entries[sid] = (entry[0], expires_at, entry[2])
+
+    def delete(self, sid):
+        self.store.delete(sid)
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def sweep(self, now):
+        return self.store.sweep(now)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface backed by `store` (anything with load/save/touch/delete/sweep)."""
+
+    serializer = TaggedJSONSerializer()
+    salt = 'server-side-session'
+
+    def __init__(self, store, sweep_interval=600):
+        self.store = store
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie or not app.secret_key:
+            return ServerSideSession()
+        try:
+            sid = self._signer(app).unsign(cookie).decode()
+        except BadSignature:
+            return ServerSideSession()
+        entry = self.store.load(sid)
+        now = int(time.time())
+        if entry is None or entry[1] <= now:
+            return ServerSideSession()
+        lifetime = int(app.permanent_session_lifetime.total_seconds())
+        return ServerSideSession(self.serializer.loads(entry[0]), sid=sid,
+                                 refresh=entry[1] - now < lifetime // 2)
+
+    def save_session(self, app, session, response):
+        now = int(time.time())
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            self.store.sweep(now)
+
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            if session.modified and session.sid:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        lifetime = int(app.permanent_session_lifetime.total_seconds())
+        if not session.modified:
+            if session.refresh:
+                self.store.touch(session.sid, now + lifetime)
+            return
+
+        # New data, new id: cached copies of the old id elsewhere can never be mistaken for current.
+        if session.sid:
+            self.store.delete(session.sid)
+        sid = secrets.token_urlsafe(32)
+        self.store.save(sid, self.serializer.dumps(dict(session)), now + lifetime)
+        response.set_cookie(
+            name,
+            self._signer(app).sign(sid).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
@@ -42,6 +42,15 @@ document.addEventListener('DOMContentLoaded', () => {
     const taskTimerStates = {};
     // last session increment in seconds (most recent active focus session)
     let lastSessionIncrement = 0;
+    // id of the active focus session; /sync treats each session's seconds as a running total
+    let focusSessionId = null;
+    // session behind lastSessionIncrement, so a reset can discard exactly that session
+    let lastSessionId = null;
+    // queued /sync heartbeats keyed by todo + session (highest total wins)
+    const pendingFocusSync = {};
+    // last /sync request, so absolute focus writes are ordered after it
+    let lastFocusSync = Promise.resolve();
+    const FOCUS_SYNC_INTERVAL_MS = 15000;
 
     const TASK_STATE_KEY = 'todo_task_timer_states_v1';
 
@@ -600,10 +609,17 @@ document.addEventListener('DOMContentLoaded', () => {
             if (li) {
                 const persisted = parseInt(li.dataset.focusedTime) || 0;
                 const subtract = Math.max(0, lastSessionIncrement || 0);
-                const newVal = Math.max(0, persisted - subtract);
-                li.dataset.focusedTime = newVal;
-                // update overdue_time/wasOverdue based on new focused value (server will compute normalization)
-                updateFocusTimeOnServer(taskId, newVal);
+                // Nothing to take back: send nothing, since an absolute write would overwrite
+                // focus time synced from other tabs or still buffered on the server
+                if (lastSessionId && subtract > 0) {
+                    li.dataset.focusedTime = Math.max(0, persisted - subtract);
+                    // Discard the session through the server's session ledger so heartbeats for it
+                    // still in flight (or retried) cannot re-add it after the reset
+                    delete pendingFocusSync[`${taskId}:${lastSessionId}`];
+                    discardFocusSessionOnServer(taskId, lastSessionId, subtract);
+                    lastSessionId = null;
+                    lastSessionIncrement = 0;
+                }
                 // remove only the live extra visual showing session-only overtime
                 const extra = li.querySelector('.overdue-extra'); if (extra) extra.remove();
                 // update progress bar to reflect new persisted focused time
@@ -785,7 +801,7 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
-    function addTodoItemToDOM(id, text, completed, durationHours, durationMinutes, focusedTime, wasOverdue, overdueTime) {
+    function addTodoItemToDOM(id, text, completed, durationHours, durationMinutes, focusedTime, wasOverdue, overdueTime, appendCompleted) {
     const li = document.createElement('li');
         li.dataset.id = id;
         li.dataset.durationHours = durationHours;
@@ -853,7 +869,9 @@ document.addEventListener('DOMContentLoaded', () => {
                 const extra = li.querySelector('.overdue-extra'); if (extra) extra.remove();
                 li.classList.add('completed');
                 // Prepend completed items so newest-completed appear at the top
-                if (completedList.firstChild) completedList.insertBefore(li, completedList.firstChild);
+                // (pages loaded from /api/todos already arrive newest-first and are appended)
+                if (appendCompleted) completedList.appendChild(li);
+                else if (completedList.firstChild) completedList.insertBefore(li, completedList.firstChild);
                 else completedList.appendChild(li);
                 // If this completed task had overdue time persisted, show the small overdue indicator under the title
                 if (parseInt(li.dataset.overdueTime) > 0 || parseInt(li.dataset.wasOverdue) === 1) {
@@ -1198,13 +1216,15 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // --- Browser notifications + sound helpers ---
     function playSound(soundType) {
+        // Versioned (cacheable) URLs are rendered onto <body> by the template
+        const sounds = document.body.dataset;
         let soundFile = '';
         if (soundType === 'break') {
-            soundFile = '/static/sounds/Break timer start.wav';
+            soundFile = sounds.soundBreak || '/static/sounds/Break timer start.wav';
         } else if (soundType === 'start') {
-            soundFile = '/static/sounds/Focus timer start.wav';
+            soundFile = sounds.soundStart || '/static/sounds/Focus timer start.wav';
         } else if (soundType === 'complete') {
-            soundFile = '/static/sounds/progress bar full.wav';
+            soundFile = sounds.soundComplete || '/static/sounds/progress bar full.wav';
         }
 
         if (soundFile) {
@@ -1320,6 +1340,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     function startFocusTimer() {
         focusSessionStartTime = Date.now();
+        focusSessionId = newFocusSessionId();
         const li = document.querySelector(`li[data-id='${currentRunningTaskId}']`);
         if (li) {
             lastFocusedTime = parseInt(li.dataset.focusedTime) || 0;
@@ -1335,6 +1356,7 @@ document.addEventListener('DOMContentLoaded', () => {
         const elapsedSeconds = Math.floor((Date.now() - focusSessionStartTime) / 1000);
         focusSessionStartTime = 0; // Reset start time BEFORE calculating new focused time
         lastSessionIncrement = elapsedSeconds;
+        lastSessionId = focusSessionId;
         const li = document.querySelector(`li[data-id='${currentRunningTaskId}']`);
         if (li) {
             try { li.dataset.processing = 1; console.log('DEBUG: stopFocusTimer set processing for', li.dataset.id); } catch (e) { /* ignore */ }
@@ -1343,20 +1365,95 @@ document.addEventListener('DOMContentLoaded', () => {
             const clampedFocusedTime = Math.min(newFocusedTime, CLAMP_MAX);
             console.log('DEBUG: stopFocusTimer - elapsedSeconds:', elapsedSeconds, 'newFocusedTime:', newFocusedTime, 'clamped:', clampedFocusedTime);
             li.dataset.focusedTime = clampedFocusedTime;
-            updateFocusTimeOnServer(currentRunningTaskId, clampedFocusedTime);
+            if (elapsedSeconds > 0) {
+                queueFocusSync(currentRunningTaskId, focusSessionId, elapsedSeconds);
+                flushFocusSync();
+            }
+            applyFocusedTimeLocally(li, clampedFocusedTime);
             lastFocusedTime = newFocusedTime;
             updateProgressBar(currentRunningTaskId);
         }
     }
 
-    function updateFocusTimeOnServer(todoId, focusedTime) {
-        fetch('/update_focus_time', {
+    function newFocusSessionId() {
+        if (window.crypto && typeof window.crypto.randomUUID === 'function') return window.crypto.randomUUID();
+        return Date.now().toString(36) + Math.random().toString(36).slice(2);
+    }
+
+    function queueFocusSync(todoId, sessionId, seconds) {
+        if (!todoId || !sessionId || !(seconds > 0)) return;
+        const key = `${todoId}:${sessionId}`;
+        const prev = pendingFocusSync[key];
+        if (!prev || prev.seconds < seconds) {
+            pendingFocusSync[key] = { id: todoId, session_id: sessionId, seconds: seconds };
+        }
+    }
+
+    // Send all queued heartbeats in one request. Failed batches are re-queued; resending is safe
+    // because the server only applies the part of a session total it has not seen yet.
+    function flushFocusSync(useBeacon) {
+        const updates = Object.values(pendingFocusSync);
+        if (updates.length === 0) return lastFocusSync;
+        Object.keys(pendingFocusSync).forEach(k => delete pendingFocusSync[k]);
+        const body = JSON.stringify({ updates: updates });
+        if (useBeacon && navigator.sendBeacon) {
+            navigator.sendBeacon('/sync', new Blob([body], { type: 'application/json' }));
+            return lastFocusSync;
+        }
+        lastFocusSync = fetch('/sync', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: body,
+            keepalive: true,
+        })
+        .then(resp => { if (!resp.ok) throw new Error(`sync failed: ${resp.status}`); })
+        .catch(err => {
+            console.log('DEBUG: flushFocusSync failed, re-queueing', err);
+            updates.forEach(u => queueFocusSync(u.id, u.session_id, u.seconds));
+        });
+        return lastFocusSync;
+    }
+
+    function queueActiveFocusSession() {
+        if (focusSessionStartTime > 0 && currentRunningTaskId && focusSessionId) {
+            const elapsed = Math.floor((Date.now() - focusSessionStartTime) / 1000);
+            queueFocusSync(currentRunningTaskId, focusSessionId, elapsed);
+        }
+    }
+
+    // Periodic heartbeat so a crashed or closed tab loses at most one interval of focus time
+    setInterval(() => {
+        queueActiveFocusSession();
+        flushFocusSync();
+    }, FOCUS_SYNC_INTERVAL_MS);
+
+    window.addEventListener('pagehide', () => {
+        queueActiveFocusSession();
+        flushFocusSync(true);
+    });
+
+    // Mirror the server's overdue computation so the UI updates without waiting for a flush
+    function applyFocusedTimeLocally(li, focusedTime) {
+        const durationSeconds = (parseInt(li.dataset.durationHours) || 0) * 3600 + (parseInt(li.dataset.durationMinutes) || 0) * 60;
+        const overdue = (durationSeconds > 0 && focusedTime > durationSeconds) ? focusedTime - durationSeconds : 0;
+        li.dataset.wasOverdue = overdue > 0 ? 1 : 0;
+        li.dataset.overdueTime = overdue;
+        if (overdue > 0) {
+            if (!li.classList.contains('completed')) li.classList.add('overdue');
+            li.dataset.overdueBaseline = durationSeconds;
+        }
+        try { delete li.dataset.processing; } catch (e) {}
+    }
+
+    // Take one focus session (its final total in seconds) back out of a task's focused time
+    function discardFocusSessionOnServer(todoId, sessionId, seconds) {
+        lastFocusSync.then(() => fetch('/discard_focus_session', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ id: todoId, focused_time: focusedTime }),
-        })
+            body: JSON.stringify({ id: todoId, session_id: sessionId, seconds: seconds }),
+        }))
         .then(resp => resp.json())
         .then(data => {
             const li = document.querySelector(`li[data-id='${todoId}']`);
@@ -1381,12 +1478,12 @@ document.addEventListener('DOMContentLoaded', () => {
                     lastFocusedTime = norm;
                 }
                 // clear any temporary processing flag now that server responded
-                try { delete li.dataset.processing; console.log('DEBUG: updateFocusTimeOnServer cleared processing for', todoId); } catch (e) {}
+                try { delete li.dataset.processing; console.log('DEBUG: discardFocusSessionOnServer cleared processing for', todoId); } catch (e) {}
             }
         });
         // Fallback: clear processing after 1.5s in case server is slow or network fails
         setTimeout(() => {
-            try { const li = document.querySelector(`li[data-id='${todoId}']`); if (li && li.dataset && li.dataset.processing) { delete li.dataset.processing; console.log('DEBUG: updateFocusTimeOnServer fallback cleared processing for', todoId); } } catch (e) {}
+            try { const li = document.querySelector(`li[data-id='${todoId}']`); if (li && li.dataset && li.dataset.processing) { delete li.dataset.processing; console.log('DEBUG: discardFocusSessionOnServer fallback cleared processing for', todoId); } } catch (e) {}
         }, 1500);
     }
 
@@ -1456,13 +1553,6 @@ document.addEventListener('DOMContentLoaded', () => {
         }
 
     // Initial progress bar update and restore overdue state from dataset
-    // Ensure completed-list shows newest-first by sorting existing items by data-id descending
-    const completedItemsInitial = Array.from(document.querySelectorAll('#completed-list li'));
-    if (completedItemsInitial.length > 1) {
-        completedItemsInitial.sort((a, b) => parseInt(b.dataset.id) - parseInt(a.dataset.id));
-        const completedListEl = document.getElementById('completed-list');
-        completedItemsInitial.forEach(item => completedListEl.appendChild(item));
-    }
 
     // Note: callers use triggerOverdueForTaskLocal directly.
 
@@ -1566,6 +1656,39 @@ document.addEventListener('DOMContentLoaded', () => {
         if (globalProgressCheckerInterval) clearInterval(globalProgressCheckerInterval);
     });
 
+    // Completed todos are not rendered by the server; page them in from /api/todos (newest first)
+    const completedLoadMoreBtn = document.getElementById('completed-load-more');
+    const COMPLETED_PAGE_SIZE = 100;
+    let completedCursor = null;
+    let completedExhausted = false;
+    let completedLoading = null;
+
+    function loadCompletedPage() {
+        if (completedExhausted) return Promise.resolve();
+        if (completedLoading) return completedLoading;
+        const params = new URLSearchParams({ status: 'completed', order: 'desc', limit: COMPLETED_PAGE_SIZE });
+        if (completedCursor !== null) params.set('cursor', completedCursor);
+        completedLoading = fetch(`/api/todos?${params}`)
+        .then(res => res.json())
+        .then(data => {
+            (data.todos || []).forEach(t => {
+                // skip items already moved here by toggling during this page view
+                if (document.querySelector(`li[data-id='${t.id}']`)) return;
+                addTodoItemToDOM(t.id, t.text, t.completed, t.duration_hours, t.duration_minutes, t.focused_time, t.was_overdue, t.overdue_time, true);
+            });
+            completedCursor = data.next_cursor;
+            completedExhausted = data.next_cursor === null || typeof data.next_cursor === 'undefined';
+            if (completedLoadMoreBtn) completedLoadMoreBtn.style.display = (!completedExhausted && completedList.style.display !== 'none') ? 'block' : 'none';
+        })
+        .catch(err => console.log('DEBUG: loadCompletedPage failed', err))
+        .finally(() => { completedLoading = null; });
+        return completedLoading;
+    }
+
+    if (completedLoadMoreBtn) {
+        completedLoadMoreBtn.addEventListener('click', () => loadCompletedPage());
+    }
+
     // Wire completed list toggle
     const completedToggle = document.getElementById('completed-toggle');
     const completedListEl = document.getElementById('completed-list');
@@ -1575,9 +1698,12 @@ document.addEventListener('DOMContentLoaded', () => {
             if (expanded) {
                 completedListEl.style.display = 'none';
                 completedToggle.setAttribute('aria-expanded', 'false');
+                if (completedLoadMoreBtn) completedLoadMoreBtn.style.display = 'none';
             } else {
                 completedListEl.style.display = 'block';
                 completedToggle.setAttribute('aria-expanded', 'true');
+                if (completedCursor === null && !completedExhausted) loadCompletedPage();
+                else if (completedLoadMoreBtn && !completedExhausted) completedLoadMoreBtn.style.display = 'block';
             }
         });
     }
@@ -1585,33 +1711,28 @@ document.addEventListener('DOMContentLoaded', () => {
     // Clear All completed tasks handler
     const clearCompletedBtn = document.getElementById('clear-completed-button');
     if (clearCompletedBtn) {
-        clearCompletedBtn.addEventListener('click', () => {
-            const completedItems = Array.from(document.querySelectorAll('#completed-list li'));
-            if (completedItems.length === 0) return;
-            // Confirm destructive action
-            if (!confirm(`Clear ${completedItems.length} completed task(s)? This cannot be undone.`)) return;
-
-            // Optimistically remove from UI and issue delete requests
-            completedItems.forEach(li => {
-                const id = li.dataset.id;
-                // Remove from DOM immediately for responsiveness
-                li.remove();
-                // Call server to delete
-                fetch('/delete', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ id: id }),
-                })
-                .then(res => res.json())
-                .then(data => {
-                    if (!data || data.result !== 'success') {
-                        console.log('DEBUG: failed to delete completed todo', id, data);
-                        // On failure, we could refresh the page to reconcile, but keep simple for now
-                    }
-                })
-                .catch(err => console.log('DEBUG: error deleting completed todo', id, err));
-            });
-        });
+        clearCompletedBtn.addEventListener('click', clearAllCompleted);
+    }
+
+    // One server-side delete for the whole history, which need not be paged in first
+    function clearAllCompleted() {
+        // Confirm destructive action
+        if (!confirm('Clear all completed tasks? This cannot be undone.')) return;
+
+        fetch('/clear_completed', { method: 'POST' })
+        .then(res => res.json())
+        .then(data => {
+            if (!data || data.result !== 'success') {
+                console.log('DEBUG: failed to clear completed todos', data);
+                return;
+            }
+            document.querySelectorAll('#completed-list li').forEach(li => li.remove());
+            // Nothing left to page in
+            completedCursor = null;
+            completedExhausted = true;
+            if (completedLoadMoreBtn) completedLoadMoreBtn.style.display = 'none';
+        })
+        .catch(err => console.log('DEBUG: error clearing completed todos', err));
     }
 
     // Debug helpers: expose functions so user can force-check overdue and open modal from console
@@ -1625,7 +1746,8 @@ document.addEventListener('DOMContentLoaded', () => {
         showOverduePrompt(id, 'Test: Planned time reached — mark complete or continue?');
     };
 
-    // Test helper: reset a task's focused time to zero (client + server) for clean reproduction
+    // Test helper: reset a task's focused time to zero in the UI for clean reproduction.
+    // The server copy is left alone: an absolute write there would overwrite time synced by other tabs.
     window.resetTaskProgress = function(id) {
         try {
             const li = document.querySelector(`li[data-id='${id}']`);
@@ -1636,9 +1758,6 @@ document.addEventListener('DOMContentLoaded', () => {
                 li.classList.remove('overdue');
                 updateProgressBar(id);
             }
-            // Also ask server to reset
-            fetch('/update_focus_time', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ id: id, focused_time: 0 }) })
-            .then(r => r.json()).then(() => { console.log('DEBUG: resetTaskProgress server responded for', id); }).catch(e => console.log('DEBUG: resetTaskProgress server error', e));
         } catch (e) { console.log('DEBUG: resetTaskProgress failed', e); }
     };
 });
@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Configure the app before it is imported: a throwaway database, and a flush
+# interval long enough that tests decide when buffered heartbeats are written.
+_tmpdir = tempfile.mkdtemp(prefix='todoapp-tests-')
+os.environ['DATABASE_PATH'] = os.path.join(_tmpdir, 'test.db')
+os.environ['FOCUS_FLUSH_INTERVAL'] = '3600'
+os.environ['SECRET_KEY'] = 'test-secret'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as todo_app  # noqa: E402
+
+USER = {'sub': 'user-1', 'name': 'User One', 'email': 'user-1@example.test'}
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(todo_app, 'focus_buffer', todo_app.FocusWriteBuffer(3600))
+    with todo_app.app.app_context():
+        todo_app.init_db()
+    return todo_app.app
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = USER
+    return client
+
+
+@pytest.fixture
+def add_todo(client):
+    def add(text='Write tests', hours='1', minutes='0'):
+        resp = client.post('/add', json={'text': text, 'duration_hours': hours, 'duration_minutes': minutes})
+        assert resp.status_code == 200
+        return resp.get_json()['id']
+    return add
+
+
+@pytest.fixture
+def query(app):
+    def query(sql, args=()):
+        with app.app_context():
+            return [dict(row) for row in todo_app.get_db().execute(sql, args).fetchall()]
+    return query
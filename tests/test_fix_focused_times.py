@@ -0,0 +1,106 @@
+import pytest
+
+import app as todo_app
+
+# id -> focused_time; the millisecond values sit on both edges of 1- and 2-id chunks.
+ROWS = {1: 5_000_000, 2: 2_000_000, 3: 300, 4: 1_500_000, 5: 7_200_000}
+FIXED = {1: 5000, 2: 2000, 3: 300, 4: 1500, 5: 7200}
+
+
+@pytest.fixture
+def todos(app):
+    with app.app_context():
+        db = todo_app.get_db()
+        db.executemany(
+            'INSERT INTO todos (id, user_id, text, duration_hours, duration_minutes, focused_time) '
+            "VALUES (?, 'user-1', 'todo', 1, 0, ?)", ROWS.items())
+        db.commit()
+
+
+def run(app, *args):
+    result = app.test_cli_runner().invoke(args=['fix-focused-times', *args])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def focused_times(query):
+    return {r['id']: r['focused_time'] for r in query('SELECT id, focused_time FROM todos')}
+
+
+def save_checkpoint(app, last_id):
+    with app.app_context():
+        db = todo_app.get_db()
+        db.execute('INSERT INTO maintenance_checkpoints (name, last_id) VALUES (?, ?)',
+                   (todo_app.FIX_FOCUSED_TIMES_CHECKPOINT, last_id))
+        db.commit()
+
+
+def checkpoints(query):
+    return query('SELECT name, last_id FROM maintenance_checkpoints')
+
+
+@pytest.mark.parametrize('chunk_size', ['1', '2', '1000'])
+def test_fixes_every_row_regardless_of_chunk_edges(app, todos, query, chunk_size):
+    assert 'Fixed 4 todos.' in run(app, '--chunk-size', chunk_size)
+    assert focused_times(query) == FIXED
+    assert checkpoints(query) == []
+
+    # Overdue flags are recomputed against the 1h duration.
+    row = query('SELECT was_overdue, overdue_time FROM todos WHERE id = 5')[0]
+    assert row == {'was_overdue': 1, 'overdue_time': 3600}
+
+
+def test_resumes_after_saved_checkpoint(app, todos, query):
+    save_checkpoint(app, 2)
+    output = run(app, '--chunk-size', '2')
+    assert 'Resuming after id 2.' in output
+    assert 'Fixed 2 todos.' in output
+    assert focused_times(query) == {**ROWS, 3: 300, 4: 1500, 5: 7200}
+    assert checkpoints(query) == []
+
+
+def test_restart_ignores_checkpoint(app, todos, query):
+    save_checkpoint(app, 4)
+    output = run(app, '--restart', '--chunk-size', '1')
+    assert 'Resuming' not in output
+    assert 'Fixed 4 todos.' in output
+    assert focused_times(query) == FIXED
+    assert checkpoints(query) == []
+
+
+@pytest.mark.parametrize('checkpoint, expected', [(None, 4), (1, 3)])
+def test_dry_run_changes_nothing(app, todos, query, checkpoint, expected):
+    if checkpoint is not None:
+        save_checkpoint(app, checkpoint)
+    before = checkpoints(query)
+
+    assert f'Would fix {expected} todos.' in run(app, '--dry-run', '--chunk-size', '2')
+    assert focused_times(query) == ROWS
+    assert checkpoints(query) == before
+
+
+def test_interrupted_run_leaves_checkpoint_to_resume_from(app, todos, query, monkeypatch):
+    real_sql = todo_app._FIX_FOCUSED_TIMES_SQL
+    calls = []
+
+    class Interrupted(Exception):
+        pass
+
+    def fail_on_third_chunk(sql, params):
+        calls.append(params)
+        if len(calls) == 3:
+            raise Interrupted
+        return real_execute(sql, params)
+
+    with app.app_context():
+        db = todo_app.get_db()
+        real_execute = db.execute
+        monkeypatch.setattr(db, 'execute', lambda sql, params=(): (
+            fail_on_third_chunk(sql, params) if sql == real_sql else real_execute(sql, params)))
+        result = app.test_cli_runner().invoke(args=['fix-focused-times', '--chunk-size', '2'])
+    assert isinstance(result.exception, Interrupted)
+    assert checkpoints(query) == [{'name': todo_app.FIX_FOCUSED_TIMES_CHECKPOINT, 'last_id': 4}]
+    assert focused_times(query) == {**FIXED, 5: ROWS[5]}
+
+    assert 'Resuming after id 4.' in run(app, '--chunk-size', '2')
+    assert focused_times(query) == FIXED
@@ -0,0 +1,39 @@
+from prometheus_client import REGISTRY
+
+import app as todo_app
+
+
+def lock_waits():
+    return REGISTRY.get_sample_value('todoapp_sql_lock_wait_seconds_count') or 0
+
+
+def test_write_routes_report_lock_wait(client, add_todo):
+    before = lock_waits()
+    todo_id = add_todo()
+    client.post('/toggle', json={'id': todo_id})
+    client.post('/update_focus_time', json={'id': todo_id, 'focused_time': 60})
+    client.post('/delete', json={'id': todo_id})
+    # One per route, plus the session store's own writes.
+    assert lock_waits() - before >= 4
+
+
+def test_session_store_writes_report_lock_wait(client):
+    before = lock_waits()
+    client.get('/logout')
+    assert lock_waits() > before
+
+
+def test_metrics_endpoint_is_off_without_token(app, monkeypatch):
+    monkeypatch.setattr(todo_app, 'METRICS_TOKEN', None)
+    assert app.test_client().get('/metrics').status_code == 404
+
+
+def test_metrics_endpoint_requires_bearer_token(app, monkeypatch):
+    monkeypatch.setattr(todo_app, 'METRICS_TOKEN', 'scrape-secret')
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+    resp = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+    assert resp.status_code == 200
+    assert b'todoapp_sql_lock_wait_seconds' in resp.data
@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+
+import app as todo_app
+
+# schema.sql as it was before migrations existed.
+BASELINE_SCHEMA = """
+CREATE TABLE todos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    duration_hours INTEGER,
+    duration_minutes INTEGER,
+    focused_time INTEGER NOT NULL DEFAULT 0
+);
+"""
+# What the old startup hook added on top of it.
+OVERDUE_COLUMNS = """
+ALTER TABLE todos ADD COLUMN was_overdue INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE todos ADD COLUMN overdue_time INTEGER NOT NULL DEFAULT 0;
+"""
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    path = str(tmp_path / 'legacy.db')
+    monkeypatch.setattr(todo_app, 'DATABASE', path)
+
+    def build(*scripts):
+        db = sqlite3.connect(path)
+        for script in scripts:
+            db.executescript(script)
+        db.execute("INSERT INTO todos (user_id, text, duration_hours, duration_minutes, focused_time) "
+                   "VALUES ('user-1', 'legacy todo', 1, 30, 600)")
+        db.commit()
+        db.close()
+        return path
+    return build
+
+
+def inspect(path):
+    db = sqlite3.connect(path)
+    try:
+        versions = [r[0] for r in db.execute('SELECT version FROM schema_version ORDER BY version')]
+        columns = {r[1] for r in db.execute("PRAGMA table_info('todos')")}
+        indexes = {r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'todos'")}
+        tables = {r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        todo = db.execute('SELECT text, focused_time, was_overdue, overdue_time FROM todos').fetchone()
+        stats = db.execute("SELECT total_todos, total_focus_seconds FROM user_stats WHERE user_id = 'user-1'").fetchone()
+    finally:
+        db.close()
+    return versions, columns, indexes, tables, todo, stats
+
+
+@pytest.mark.parametrize('scripts, stamped', [
+    ((BASELINE_SCHEMA,), [1]),
+    ((BASELINE_SCHEMA, OVERDUE_COLUMNS), [1, 2]),
+], ids=['baseline', 'with-overdue-columns'])
+def test_legacy_database_is_stamped_and_migrated_once(legacy_db, scripts, stamped):
+    path = legacy_db(*scripts)
+    all_versions = [version for version, _name, _sql in todo_app.load_migrations()]
+
+    applied = todo_app.migrate_database()
+    assert len(applied) == len(all_versions) - len(stamped)
+    assert todo_app.migrate_database() == []
+
+    versions, columns, indexes, tables, todo, stats = inspect(path)
+    assert versions == all_versions
+    assert {'was_overdue', 'overdue_time'} <= columns
+    assert {'idx_todos_user_id', 'idx_todos_user_completed_id'} <= indexes
+    assert {'focus_sessions', 'maintenance_checkpoints', 'user_stats', 'user_daily_stats', 'sessions'} <= tables
+    assert todo == ('legacy todo', 600, 0, 0)
+    assert stats == (1, 600)
+
+
+def test_failed_migration_is_rolled_back(legacy_db, monkeypatch):
+    path = legacy_db(BASELINE_SCHEMA)
+    migrations = todo_app.load_migrations()
+    broken = migrations[:2] + [(3, '0003_broken.sql', 'CREATE INDEX idx_ok ON todos (text);\nSELECT * FROM missing;')]
+    monkeypatch.setattr(todo_app, 'load_migrations', lambda: broken)
+
+    with pytest.raises(sqlite3.OperationalError):
+        todo_app.migrate_database()
+    db = sqlite3.connect(path)
+    try:
+        assert db.execute("SELECT name FROM sqlite_master WHERE name = 'idx_ok'").fetchone() is None
+        assert 'was_overdue' not in {r[1] for r in db.execute("PRAGMA table_info('todos')")}
+    finally:
+        db.close()
@@ -0,0 +1,135 @@
+import json
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+from oidc_cache import CachingOAuth
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bench'))
+
+from oauth_stub import StubProvider  # noqa: E402
+
+METADATA_PATH = '/.well-known/openid-configuration'
+CLIENT_ID = 'test-client'
+
+
+@pytest.fixture
+def provider():
+    provider = StubProvider().start()
+    yield provider
+    provider.stop()
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / 'oidc-cache')
+
+
+def make_client(provider, cache_dir, ttl=3600):
+    """A fresh client, as a newly started worker would have."""
+    oauth = CachingOAuth(Flask(__name__))
+    return oauth.register(name='stub', client_id=CLIENT_ID, client_secret='unused',
+                          server_metadata_url=provider.metadata_url, client_kwargs={'scope': 'openid'},
+                          metadata_cache_dir=cache_dir, metadata_ttl=ttl)
+
+
+def login_token(provider, nonce='n-1'):
+    return provider.exchange_code(provider.issue_code(CLIENT_ID, nonce))
+
+
+def test_workers_share_metadata_through_private_cache(provider, cache_dir):
+    assert make_client(provider, cache_dir).load_server_metadata()['issuer'] == provider.issuer
+    client = make_client(provider, cache_dir)
+    assert client.load_server_metadata()['issuer'] == provider.issuer
+    assert provider.requests[METADATA_PATH] == 1
+
+    assert os.stat(cache_dir).st_mode & 0o777 == 0o700
+    assert os.stat(client._cache_path()).st_mode & 0o777 == 0o600
+
+
+def age_cache_file(client, seconds):
+    with open(client._cache_path()) as f:
+        entry = json.load(f)
+    entry['fetched_at'] -= seconds
+    with open(client._cache_path(), 'w') as f:
+        json.dump(entry, f)
+
+
+def test_metadata_is_refetched_after_ttl(provider, cache_dir):
+    client = make_client(provider, cache_dir, ttl=60)
+    client.load_server_metadata()
+
+    # A new worker does not trust an expired file and refreshes it for everyone.
+    age_cache_file(client, 120)
+    make_client(provider, cache_dir, ttl=60).load_server_metadata()
+    assert provider.requests[METADATA_PATH] == 2
+
+    # Once its in-memory copy expires, the first worker picks up that refresh from disk...
+    client.server_metadata['_loaded_at'] -= 120
+    client.load_server_metadata()
+    assert provider.requests[METADATA_PATH] == 2
+
+    # ...and refetches itself when the file has expired too.
+    client.server_metadata['_loaded_at'] -= 120
+    age_cache_file(client, 120)
+    client.load_server_metadata()
+    assert provider.requests[METADATA_PATH] == 3
+
+
+def test_unknown_kid_forces_jwks_refresh(provider, cache_dir):
+    nonce = 'n-1'
+    userinfo = make_client(provider, cache_dir).parse_id_token(login_token(provider, nonce), nonce)
+    assert userinfo['sub'] == 'bench-user-0'
+    assert provider.requests['/jwks'] == 1
+
+    provider.rotate_key()
+    # The new worker starts from the cached (now stale) JWKS and must refetch for the new kid.
+    client = make_client(provider, cache_dir)
+    assert client.parse_id_token(login_token(provider, nonce), nonce)['sub'] == 'bench-user-0'
+    assert provider.requests['/jwks'] == 2
+    with open(client._cache_path()) as f:
+        assert [k['kid'] for k in json.load(f)['jwks']['keys']] == [provider.kid]
+
+    # ...and the refreshed set is what the next worker reads from disk.
+    make_client(provider, cache_dir).parse_id_token(login_token(provider, nonce), nonce)
+    assert provider.requests['/jwks'] == 2
+    assert provider.requests[METADATA_PATH] == 1
+
+
+def plant_cache_file(client, issuer='http://attacker.invalid'):
+    with open(client._cache_path(), 'w') as f:
+        json.dump({'fetched_at': 4102444800, 'metadata': {'issuer': issuer}}, f)
+
+
+def test_cache_dir_writable_by_others_is_ignored(provider, cache_dir):
+    os.makedirs(cache_dir)
+    os.chmod(cache_dir, 0o777)
+    client = make_client(provider, cache_dir)
+    plant_cache_file(client)
+
+    assert client.load_server_metadata()['issuer'] == provider.issuer
+    assert provider.requests[METADATA_PATH] == 1
+
+
+def test_cache_file_writable_by_others_is_ignored(provider, cache_dir):
+    os.makedirs(cache_dir, mode=0o700)
+    client = make_client(provider, cache_dir)
+    plant_cache_file(client)
+    os.chmod(client._cache_path(), 0o666)
+
+    assert client.load_server_metadata()['issuer'] == provider.issuer
+    assert provider.requests[METADATA_PATH] == 1
+
+
+@pytest.mark.skipif(not hasattr(os, 'geteuid') or os.geteuid() != 0, reason='needs root to chown')
+def test_cache_file_owned_by_another_user_is_ignored(provider, cache_dir):
+    os.makedirs(cache_dir, mode=0o700)
+    client = make_client(provider, cache_dir)
+    plant_cache_file(client)
+    os.chmod(client._cache_path(), 0o600)
+    os.chown(client._cache_path(), 65534, 65534)
+
+    assert client.load_server_metadata()['issuer'] == provider.issuer
+    assert provider.requests[METADATA_PATH] == 1
@@ -0,0 +1,225 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from flask import session
+from itsdangerous import Signer
+
+import app as todo_app
+import sessions
+from conftest import USER
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_saving_session_never_commits_the_views_writes(app, query, monkeypatch):
+    monkeypatch.setattr(app.session_interface, '_next_sweep', 0)  # sweep on this request too
+    with app.test_request_context('/'):
+        # A view that wrote and then failed, leaving its transaction open.
+        todo_app.get_db().execute("INSERT INTO todos (user_id, text) VALUES ('user-1', 'half done')")
+        session['user'] = USER
+        app.session_interface.save_session(app, session, app.response_class())
+    assert query('SELECT * FROM todos') == []
+    assert len(query('SELECT id FROM sessions')) == 1
+
+
+COOKIE = 'session'
+
+
+def cookie_value(client):
+    cookie = client.get_cookie(COOKIE)
+    return cookie.value if cookie else None
+
+
+def sid_of(app, value):
+    return Signer(app.secret_key, salt=app.session_interface.salt).unsign(value).decode()
+
+
+def stored_ids(query):
+    return {r['id'] for r in query('SELECT id FROM sessions')}
+
+
+def forget_cached(app):
+    app.session_interface.store._entries.clear()
+
+
+def test_every_data_change_gets_a_new_id(app, client, query):
+    first = cookie_value(client)
+    assert stored_ids(query) == {sid_of(app, first)}
+
+    # Reading the session changes nothing.
+    resp = client.get('/api/stats')
+    assert resp.status_code == 200
+    assert COOKIE not in resp.headers.get('Set-Cookie', '')
+    assert cookie_value(client) == first
+
+    with client.session_transaction() as sess:
+        sess['theme'] = 'dark'
+    second = cookie_value(client)
+    assert second != first
+    assert stored_ids(query) == {sid_of(app, second)}
+
+
+def test_logout_invalidates_old_cookie(app, client, query):
+    old = cookie_value(client)
+    client.get('/logout')
+    assert cookie_value(client) is None
+    assert stored_ids(query) == set()
+
+    replay = app.test_client()
+    replay.set_cookie(COOKIE, old)
+    assert replay.get('/api/stats').status_code == 401
+
+
+def test_tampered_cookie_is_ignored(app, client):
+    forged = app.test_client()
+    forged.set_cookie(COOKIE, cookie_value(client)[:-2] + 'xx')
+    assert forged.get('/api/stats').status_code == 401
+
+
+def test_expired_session_is_rejected(app, client, query):
+    with app.app_context():
+        db = todo_app.get_db()
+        db.execute('UPDATE sessions SET expires_at = ?', (int(time.time()) - 1,))
+        db.commit()
+    forget_cached(app)
+    assert client.get('/api/stats').status_code == 401
+
+
+def test_session_past_half_life_is_extended(app, client, query):
+    lifetime = int(app.permanent_session_lifetime.total_seconds())
+    with app.app_context():
+        db = todo_app.get_db()
+        db.execute('UPDATE sessions SET expires_at = ?', (int(time.time()) + 60,))
+        db.commit()
+    forget_cached(app)
+    first = cookie_value(client)
+
+    assert client.get('/api/stats').status_code == 200
+    expires_at = query('SELECT expires_at FROM sessions')[0]['expires_at']
+    assert expires_at >= int(time.time()) + lifetime - 5
+    # Touching keeps the id.
+    assert cookie_value(client) == first
+
+
+def test_sweep_removes_expired_sessions_periodically(app, client, query, monkeypatch):
+    now = int(time.time())
+    with app.app_context():
+        db = todo_app.get_db()
+        db.executemany('INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?)',
+                       [('expired-1', '{}', now - 10), ('expired-2', '{}', now), ('live', '{}', now + 3600)])
+        db.commit()
+    current = sid_of(app, cookie_value(client))
+
+    monkeypatch.setattr(app.session_interface, '_next_sweep', 0)
+    client.get('/api/stats')
+    assert stored_ids(query) == {current, 'live'}
+
+    # The next sweep is sweep_interval away.
+    with app.app_context():
+        db = todo_app.get_db()
+        db.execute("INSERT INTO sessions (id, data, expires_at) VALUES ('expired-3', '{}', ?)", (now - 10,))
+        db.commit()
+    client.get('/api/stats')
+    assert 'expired-3' in stored_ids(query)
+
+
+class CountingStore:
+    def __init__(self):
+        self.rows = {}
+        self.loads = 0
+
+    def load(self, sid):
+        self.loads += 1
+        return self.rows.get(sid)
+
+    def save(self, sid, data, expires_at):
+        self.rows[sid] = (data, expires_at)
+
+    def touch(self, sid, expires_at):
+        self.rows[sid] = (self.rows[sid][0], expires_at)
+
+    def delete(self, sid):
+        self.rows.pop(sid, None)
+
+
+def test_cache_evicts_least_recently_used():
+    inner = CountingStore()
+    cache = sessions.CachedSessionStore(inner, max_entries=2, ttl=30)
+    cache.save('a', 'A', 100)
+    cache.save('b', 'B', 100)
+    assert cache.load('a') == ('A', 100)  # hit; 'a' is now most recent
+    cache.save('c', 'C', 100)  # evicts 'b'
+    assert inner.loads == 0
+
+    assert cache.load('b') == ('B', 100)
+    assert inner.loads == 1
+    assert cache.load('c') == ('C', 100)
+    assert inner.loads == 1
+
+
+def test_cache_entries_expire_after_ttl(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(sessions.time, 'monotonic', lambda: clock[0])
+    inner = CountingStore()
+    cache = sessions.CachedSessionStore(inner, ttl=30)
+    cache.save('a', 'A', 100)
+
+    # Deleted by another worker: still visible here until the TTL runs out.
+    del inner.rows['a']
+    clock[0] += 29
+    assert cache.load('a') == ('A', 100)
+    clock[0] += 2
+    assert cache.load('a') is None
+    assert inner.loads == 1
+
+
+def test_cache_delete_and_touch_pass_through():
+    inner = CountingStore()
+    cache = sessions.CachedSessionStore(inner)
+    cache.save('a', 'A', 100)
+    cache.touch('a', 200)
+    assert cache.load('a') == ('A', 200)
+    assert inner.rows['a'] == ('A', 200)
+    cache.delete('a')
+    assert cache.load('a') is None
+    assert 'a' not in inner.rows
+
+
+@pytest.mark.parametrize('backend, expected', [
+    ('cookie', 'SecureCookieSessionInterface'),
+    ('sqlite', 'ServerSideSessionInterface'),
+])
+def test_session_backend_selection(tmp_path, backend, expected):
+    env = dict(os.environ, SESSION_BACKEND=backend, DATABASE_PATH=str(tmp_path / 'x.db'))
+    result = subprocess.run([sys.executable, '-c', 'import app; print(type(app.app.session_interface).__name__)'],
+                            cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == expected
+
+
+def test_unknown_session_backend_fails_at_import(tmp_path):
+    env = dict(os.environ, SESSION_BACKEND='redis', DATABASE_PATH=str(tmp_path / 'x.db'))
+    result = subprocess.run([sys.executable, '-c', 'import app'], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode != 0
+    assert "Unknown SESSION_BACKEND 'redis'" in result.stderr
+
+
+def test_authorize_keeps_only_identity_in_session(app, query, monkeypatch):
+    userinfo = {'sub': 'google-123', 'name': 'Ada', 'email': 'ada@example.test', 'email_verified': True,
+                'picture': 'https://example.test/' + 'p' * 500, 'locale': 'en', 'given_name': 'Ada'}
+    token = {'access_token': 'a' * 200, 'id_token': 'i' * 1200, 'expires_in': 3600, 'userinfo': userinfo}
+    monkeypatch.setattr(todo_app.google, 'authorize_access_token', lambda: token)
+
+    client = app.test_client()
+    resp = client.get('/authorize')
+    assert resp.status_code == 302
+
+    # The cookie is a signed id, however large the token was.
+    assert len(cookie_value(client)) < 100
+    data = query('SELECT data FROM sessions')[0]['data']
+    assert json.loads(data) == {'user': {'sub': 'google-123', 'name': 'Ada', 'email': 'ada@example.test'}}
+    assert client.get('/api/stats').status_code == 200
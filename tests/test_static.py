@@ -0,0 +1,74 @@
+import gzip
+
+from flask import url_for
+
+import app as todo_app
+import assets
+
+WAV = 'sounds/Focus timer start.wav'
+
+
+def test_url_for_adds_content_version(app):
+    asset = todo_app.static_assets['script.js']
+    with app.test_request_context():
+        assert url_for('static', filename='script.js') == f'/static/script.js?v={asset.version}'
+        assert url_for('static', filename='missing.js') == '/static/missing.js'
+
+
+def test_only_current_version_is_immutable(app):
+    client = app.test_client()
+    version = todo_app.static_assets['style.css'].version
+    assert client.get(f'/static/style.css?v={version}').headers['Cache-Control'] == assets.IMMUTABLE_CACHE_CONTROL
+    assert client.get('/static/style.css?v=stale').headers['Cache-Control'] == assets.REVALIDATE_CACHE_CONTROL
+    assert client.get('/static/style.css').headers['Cache-Control'] == assets.REVALIDATE_CACHE_CONTROL
+
+
+def test_precompressed_variant_has_its_own_etag(app):
+    client = app.test_client()
+    asset = todo_app.static_assets['script.js']
+
+    plain = client.get('/static/script.js', headers={'Accept-Encoding': 'identity'})
+    assert plain.headers.get('Content-Encoding') is None
+    assert plain.get_etag() == (asset.version, False)
+    assert plain.data == asset.data
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    gz = client.get('/static/script.js', headers={'Accept-Encoding': 'gzip'})
+    assert gz.headers['Content-Encoding'] == 'gzip'
+    assert gz.get_etag() == (f'{asset.version}-gzip', False)
+    assert gzip.decompress(gz.data) == asset.data
+    assert 'Accept-Encoding' in gz.headers['Vary']
+
+
+def test_if_none_match_returns_304_per_encoding(app):
+    client = app.test_client()
+    version = todo_app.static_assets['script.js'].version
+
+    resp = client.get('/static/script.js', headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{version}-gzip"'})
+    assert resp.status_code == 304
+    assert resp.data == b''
+
+    # The identity ETag does not validate the gzip variant.
+    resp = client.get('/static/script.js', headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{version}"'})
+    assert resp.status_code == 200
+
+
+def test_range_request_on_sound(app):
+    asset = todo_app.static_assets[WAV]
+    assert asset.encoded == {}  # audio is served as stored
+
+    resp = app.test_client().get(f'/static/{WAV}', headers={'Range': 'bytes=0-99'})
+    assert resp.status_code == 206
+    assert resp.headers['Content-Range'] == f'bytes 0-99/{len(asset.data)}'
+    assert resp.headers['Accept-Ranges'] == 'bytes'
+    assert resp.data == asset.data[:100]
+
+
+def test_files_outside_manifest_fall_back_to_send_static_file(app, monkeypatch):
+    monkeypatch.delitem(todo_app.static_assets, 'style.css')
+    resp = app.test_client().get('/static/style.css')
+    assert resp.status_code == 200
+    assert resp.headers.get('Cache-Control') != assets.IMMUTABLE_CACHE_CONTROL
+    assert b'{' in resp.data
+
+    assert app.test_client().get('/static/does-not-exist.js').status_code == 404
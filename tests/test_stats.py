@@ -0,0 +1,129 @@
+import app as todo_app
+
+
+def stats_rows(query):
+    totals = query('SELECT total_todos, total_focus_seconds, total_overdue_seconds, overdue_todos '
+                   'FROM user_stats WHERE user_id = ?', ('user-1',))
+    daily = query('SELECT day, focus_seconds, completed_count FROM user_daily_stats WHERE user_id = ?', ('user-1',))
+    return totals[0], daily
+
+
+def sync_and_flush(client, todo_id, session_id, seconds):
+    client.post('/sync', json={'updates': [{'id': todo_id, 'session_id': session_id, 'seconds': seconds}]})
+    todo_app.focus_buffer.flush()
+
+
+def discard(client, todo_id, session_id, seconds):
+    client.post('/discard_focus_session', json={'id': todo_id, 'session_id': session_id, 'seconds': seconds})
+
+
+def streak(query):
+    return query("SELECT current_streak, last_active_day, date('now', '-1 day') AS yesterday, date('now') AS today "
+                 'FROM user_stats WHERE user_id = ?', ('user-1',))[0]
+
+
+def test_fix_focused_times_keeps_stats_consistent(app, client, add_todo, query):
+    # Real activity today, which the repair must leave alone.
+    sync_and_flush(client, add_todo(), 's1', 600)
+    with app.app_context():
+        # A legacy row holding milliseconds, written before the heuristic existed.
+        db = todo_app.get_db()
+        todo_id = db.execute(
+            'INSERT INTO todos (user_id, text, duration_hours, duration_minutes, focused_time, was_overdue, overdue_time) '
+            "VALUES ('user-1', 'legacy', 1, 0, 5000000, 1, 4996400)").lastrowid
+        db.commit()
+
+    result = app.test_cli_runner().invoke(args=['fix-focused-times'])
+    assert result.exit_code == 0, result.output
+    assert 'Fixed 1 todos.' in result.output
+
+    totals, daily = stats_rows(query)
+    todo = query('SELECT focused_time, was_overdue, overdue_time FROM todos WHERE id = ?', (todo_id,))[0]
+    assert todo == {'focused_time': 5000, 'was_overdue': 1, 'overdue_time': 1400}
+    assert totals == {'total_todos': 2, 'total_focus_seconds': 5600, 'total_overdue_seconds': 1400,
+                      'overdue_todos': 1}
+    assert [row['focus_seconds'] for row in daily] == [600]
+    assert streak(query)['current_streak'] == 1
+    assert query('SELECT * FROM stats_log_suspended') == []
+
+
+def test_discarded_session_is_taken_out_of_the_day(client, add_todo, query):
+    todo_id = add_todo()
+    sync_and_flush(client, todo_id, 's1', 120)
+    discard(client, todo_id, 's1', 120)
+
+    totals, daily = stats_rows(query)
+    assert totals['total_focus_seconds'] == 0
+    assert [row['focus_seconds'] for row in daily] == [0]
+    assert streak(query)['current_streak'] == 0
+    assert client.get('/api/stats').get_json()['current_streak'] == 0
+
+
+def test_partial_discard_keeps_the_rest_of_the_day(client, add_todo, query):
+    todo_id = add_todo()
+    sync_and_flush(client, todo_id, 's1', 100)
+    sync_and_flush(client, todo_id, 's2', 50)
+    discard(client, todo_id, 's2', 50)
+
+    _totals, daily = stats_rows(query)
+    assert [row['focus_seconds'] for row in daily] == [100]
+    assert streak(query)['current_streak'] == 1
+
+
+def test_discard_falls_back_to_yesterdays_streak(app, client, add_todo, query):
+    with app.app_context():
+        db = todo_app.get_db()
+        db.execute("INSERT INTO user_stats (user_id, current_streak, longest_streak, last_active_day) "
+                   "VALUES ('user-1', 2, 2, date('now', '-1 day'))")
+        db.commit()
+    todo_id = add_todo()
+    sync_and_flush(client, todo_id, 's1', 100)
+    assert streak(query)['current_streak'] == 3
+
+    discard(client, todo_id, 's1', 100)
+    row = streak(query)
+    assert row['current_streak'] == 2
+    assert row['last_active_day'] == row['yesterday']
+    assert client.get('/api/stats').get_json()['current_streak'] == 2
+
+
+def test_decrease_never_takes_a_day_below_zero(app, query):
+    with app.app_context():
+        db = todo_app.get_db()
+        # Time logged before today, taken back today.
+        db.execute("INSERT INTO todos (user_id, text, focused_time) VALUES ('user-1', 'old', 500)")
+        db.execute("UPDATE todos SET focused_time = 200 WHERE user_id = 'user-1'")
+        db.commit()
+    _totals, daily = stats_rows(query)
+    assert [row['focus_seconds'] for row in daily] == [0]
+
+
+def test_stats_endpoint_reports_today(client, add_todo):
+    todo_id = add_todo()
+    client.post('/update_focus_time', json={'id': todo_id, 'focused_time': 90})
+    client.post('/toggle', json={'id': todo_id})
+
+    stats = client.get('/api/stats?days=7').get_json()
+    assert stats['total_todos'] == 1
+    assert stats['completed_todos'] == 1
+    assert stats['total_focus_seconds'] == 90
+    assert stats['today'] == {'focus_seconds': 90, 'completed_count': 1}
+    assert stats['current_streak'] == 1
+    assert len(stats['daily']) == 1
+
+
+def test_backfill_stats_repairs_drifted_totals(app, client, add_todo, query):
+    todo_id = add_todo()
+    client.post('/update_focus_time', json={'id': todo_id, 'focused_time': 300})
+    client.post('/toggle', json={'id': todo_id})
+    with app.app_context():
+        db = todo_app.get_db()
+        db.execute("UPDATE user_stats SET total_todos = 7, completed_todos = 0, total_focus_seconds = -1")
+        db.commit()
+
+    result = app.test_cli_runner().invoke(args=['backfill-stats'])
+    assert result.exit_code == 0, result.output
+    assert 'Rebuilt stats for 1 users.' in result.output
+    totals = query('SELECT total_todos, completed_todos, total_focus_seconds FROM user_stats WHERE user_id = ?',
+                   ('user-1',))[0]
+    assert totals == {'total_todos': 1, 'completed_todos': 1, 'total_focus_seconds': 300}
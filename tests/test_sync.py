@@ -0,0 +1,119 @@
+import app as todo_app
+
+
+def sync(client, *updates):
+    resp = client.post('/sync', json={'updates': [
+        {'id': todo_id, 'session_id': session_id, 'seconds': seconds} for todo_id, session_id, seconds in updates
+    ]})
+    assert resp.status_code == 200
+    return resp.get_json()
+
+
+def focused_time(query, todo_id):
+    return query('SELECT focused_time FROM todos WHERE id = ?', (todo_id,))[0]['focused_time']
+
+
+def test_duplicate_heartbeats_apply_once(client, add_todo, query):
+    todo_id = add_todo()
+    sync(client, (todo_id, 's1', 30), (todo_id, 's1', 30))
+    todo_app.focus_buffer.flush()
+    sync(client, (todo_id, 's1', 30))
+    todo_app.focus_buffer.flush()
+    assert focused_time(query, todo_id) == 30
+
+
+def test_out_of_order_heartbeats_keep_the_highest_total(client, add_todo, query):
+    todo_id = add_todo()
+    sync(client, (todo_id, 's1', 50), (todo_id, 's1', 20))
+    todo_app.focus_buffer.flush()
+    assert focused_time(query, todo_id) == 50
+
+    sync(client, (todo_id, 's1', 40))
+    todo_app.focus_buffer.flush()
+    assert focused_time(query, todo_id) == 50
+
+    sync(client, (todo_id, 's1', 80))
+    todo_app.focus_buffer.flush()
+    assert focused_time(query, todo_id) == 80
+
+
+def test_sessions_add_up(client, add_todo, query):
+    todo_id = add_todo()
+    sync(client, (todo_id, 'tab-a', 30), (todo_id, 'tab-b', 45))
+    todo_app.focus_buffer.flush()
+    assert focused_time(query, todo_id) == 75
+
+
+def test_heartbeats_for_other_users_todos_are_ignored(client, add_todo, query):
+    todo_id = add_todo()
+    todo_app.focus_buffer.add('someone-else', todo_id, 's1', 100)
+    todo_app.focus_buffer.flush()
+    assert focused_time(query, todo_id) == 0
+
+
+def test_flush_marks_overdue(client, add_todo, query):
+    todo_id = add_todo(hours='0', minutes='1')
+    sync(client, (todo_id, 's1', 90))
+    todo_app.focus_buffer.flush()
+    row = query('SELECT focused_time, was_overdue, overdue_time FROM todos WHERE id = ?', (todo_id,))[0]
+    assert row == {'focused_time': 90, 'was_overdue': 1, 'overdue_time': 30}
+
+
+def test_discard_subtracts_applied_session(client, add_todo, query):
+    todo_id = add_todo()
+    sync(client, (todo_id, 'old', 100), (todo_id, 's1', 60))
+    todo_app.focus_buffer.flush()
+
+    resp = client.post('/discard_focus_session', json={'id': todo_id, 'session_id': 's1', 'seconds': 60})
+    assert resp.get_json()['focused_time'] == 100
+    assert focused_time(query, todo_id) == 100
+
+
+def test_discard_is_idempotent(client, add_todo, query):
+    todo_id = add_todo()
+    sync(client, (todo_id, 'old', 100), (todo_id, 's1', 60))
+    todo_app.focus_buffer.flush()
+    for _ in range(2):
+        client.post('/discard_focus_session', json={'id': todo_id, 'session_id': 's1', 'seconds': 60})
+    assert focused_time(query, todo_id) == 100
+
+
+def test_discard_wins_over_heartbeats_buffered_in_another_worker(client, add_todo, query):
+    todo_id = add_todo()
+    sync(client, (todo_id, 'old', 100))
+    todo_app.focus_buffer.flush()
+
+    # Worker A accepted heartbeats for s1 but has not flushed them yet.
+    worker_a = todo_app.FocusWriteBuffer(3600)
+    worker_a.add('user-1', todo_id, 's1', 40)
+    worker_a.add('user-1', todo_id, 's1', 60)
+
+    # The reset is handled by another worker, before A flushes.
+    client.post('/discard_focus_session', json={'id': todo_id, 'session_id': 's1', 'seconds': 60})
+    worker_a.flush()
+    assert focused_time(query, todo_id) == 100
+
+
+def test_discard_wins_over_retried_heartbeats(client, add_todo, query):
+    todo_id = add_todo()
+    sync(client, (todo_id, 's1', 30))
+    todo_app.focus_buffer.flush()
+
+    client.post('/discard_focus_session', json={'id': todo_id, 'session_id': 's1', 'seconds': 60})
+    assert focused_time(query, todo_id) == 0
+
+    # The client retries the heartbeats that failed earlier, including ones past the discarded total.
+    sync(client, (todo_id, 's1', 30), (todo_id, 's1', 60), (todo_id, 's1', 75))
+    todo_app.focus_buffer.flush()
+    assert focused_time(query, todo_id) == 0
+
+    # A new session still counts.
+    sync(client, (todo_id, 's2', 20))
+    todo_app.focus_buffer.flush()
+    assert focused_time(query, todo_id) == 20
+
+
+def test_discard_requires_session(client, add_todo):
+    todo_id = add_todo()
+    resp = client.post('/discard_focus_session', json={'id': todo_id})
+    assert resp.status_code == 400
@@ -0,0 +1,60 @@
+import pytest
+
+import app as todo_app
+
+
+@pytest.mark.parametrize('status', ['active', 'completed', 'all'])
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_listing_is_served_in_index_order(app, status, order):
+    where = 'user_id = ?' + ('' if status == 'all' else ' AND completed = ?')
+    params = ('user-1',) if status == 'all' else ('user-1', 0)
+    with app.app_context():
+        plan = todo_app.get_db().execute(
+            f'EXPLAIN QUERY PLAN SELECT {todo_app.TODO_COLUMNS} FROM todos WHERE {where} AND id > ? '
+            f'ORDER BY id {order.upper()} LIMIT ?', params + (0, 10)).fetchall()
+    details = ' | '.join(row['detail'] for row in plan)
+    assert 'USING INDEX' in details
+    assert 'TEMP B-TREE' not in details
+
+
+def test_listing_pages_through_all_todos(client, add_todo):
+    ids = [add_todo(text=f'todo {n}') for n in range(5)]
+    client.post('/toggle', json={'id': ids[1]})
+
+    seen, cursor = [], None
+    while True:
+        resp = client.get('/api/todos', query_string={'status': 'all', 'limit': 2, **({'cursor': cursor} if cursor else {})})
+        page = resp.get_json()
+        seen += [t['id'] for t in page['todos']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == ids
+
+    active = client.get('/api/todos', query_string={'status': 'active', 'order': 'desc'}).get_json()
+    assert [t['id'] for t in active['todos']] == [i for i in reversed(ids) if i != ids[1]]
+
+
+def test_clear_completed_deletes_only_own_completed_todos(app, client, add_todo, query):
+    done = [add_todo(text=f'done {n}') for n in range(3)]
+    active = add_todo(text='still active')
+    for todo_id in done:
+        client.post('/toggle', json={'id': todo_id})
+    client.post('/sync', json={'updates': [{'id': done[0], 'session_id': 's1', 'seconds': 30},
+                                           {'id': active, 'session_id': 's2', 'seconds': 40}]})
+    todo_app.focus_buffer.flush()
+    with app.app_context():
+        db = todo_app.get_db()
+        db.execute("INSERT INTO todos (user_id, text, completed) VALUES ('someone-else', 'theirs', 1)")
+        db.commit()
+
+    resp = client.post('/clear_completed')
+    assert resp.get_json() == {'result': 'success', 'deleted': 3}
+    assert [r['text'] for r in query('SELECT text FROM todos ORDER BY id')] == ['still active', 'theirs']
+    assert [r['todo_id'] for r in query('SELECT todo_id FROM focus_sessions')] == [active]
+    assert query('SELECT total_todos, completed_todos FROM user_stats WHERE user_id = ?', ('user-1',)) == [
+        {'total_todos': 1, 'completed_todos': 0}]
+
+
+def test_clear_completed_requires_login(app):
+    assert app.test_client().post('/clear_completed').status_code == 401